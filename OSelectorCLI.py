@@ -0,0 +1,116 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Headless batch mode : scan folders and generate a .myo plugin without the GUI.
+PyQt5 is never imported, so it can run on machines without a display.
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import multiprocessing
+
+from util.utils import create_dir
+from util.MyoWriter import write_myo
+from util.Config import get_config
+from data import Scanner, ScanCache
+from data.Menu import Menu
+from data.Animation import Animation
+from data.Catalog import Catalog
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scan folders for FNIS animations and generate an OSA plugin (.myo)")
+    parser.add_argument("folders", nargs="+", help="folders to scan (data/, mods/ or a mod folder)")
+    parser.add_argument("-n", "--name", help="plugin name (default : PLUGIN name from conf.ini)")
+    parser.add_argument("-o", "--output", help="path of the generated .myo "
+                                               "(default : <installFolder>/<name>/<pluginFolder>/<name>.myo)")
+    parser.add_argument("-j", "--jobs", type=int, help="number of workers reading FNIS lists "
+                                                       "(default : SCAN workers from conf.ini)")
+    parser.add_argument("--no-cache", action="store_true", help="do not use the scan cache")
+    parser.add_argument("--clear-cache", action="store_true", help="clear the scan cache before scanning")
+    parser.add_argument("--package", help="only add animations of this package (top folder of the tree)")
+    parser.add_argument("--type", choices=[anim_type.name for anim_type in Animation.TYPE],
+                        help="only add animations of this type")
+    parser.add_argument("--option", action="append", default=[], choices=[option.name for option in Animation.OPTION],
+                        help="only add animations having this option, can be repeated")
+    parser.add_argument("-v", "--verbose", action="count", default=0,
+                        help="print WARNING logs (like duplicates), -vv for INFO logs")
+    return parser.parse_args(argv)
+
+
+class StageTimer:
+    """ Print the wall time of each stage """
+
+    def __init__(self):
+        self.timings = []
+
+    def __call__(self, name, start):
+        elapsed = time.perf_counter() - start
+        self.timings.append((name, elapsed))
+        print("{:<10} {:8.3f}s".format(name, elapsed))
+        return time.perf_counter()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    logging.basicConfig(level=[logging.ERROR, logging.WARNING, logging.INFO][min(args.verbose, 2)],
+                        format='[%(levelname)s] - %(name)s : %(message)s')
+
+    name = args.name or get_config().get("PLUGIN", "name")
+    output = args.output
+    if not output:
+        if not get_config().get("PATHS", "installFolder"):
+            print("Installation folder not set in conf.ini, use --output", file=sys.stderr)
+            return 2
+        output = get_config().get("PATHS", "installFolder") + "/" + name + "/" + \
+                 get_config().get("PATHS", "pluginFolder") + name + ".myo"
+
+    if args.clear_cache:
+        ScanCache.clear_cache()
+
+    use_cache = False if args.no_cache else None
+
+    timer = StageTimer()
+    total = time.perf_counter()
+
+    menu = Menu()
+    duplicate = 0
+    for folder in args.folders:
+        if not os.path.isdir(folder):
+            print("Not a folder : " + folder, file=sys.stderr)
+            return 2
+
+        start = time.perf_counter()
+        discovery, results = Scanner.scan_lists(folder, args.jobs, use_cache)
+        start = timer("discovery", start)
+        catalog = Catalog.from_packages(Scanner.group_packages(discovery.entries, results))
+        start = timer("parsing", start)
+        rows = None
+        if args.package or args.type or args.option:
+            rows = catalog.rows(package=args.package, anim_type=Animation.TYPE[args.type] if args.type else None,
+                                options=[Animation.OPTION[option] for option in args.option])
+            start = timer("filter", start)
+        duplicate += menu.add_catalog(catalog, rows)
+        timer("build", start)
+
+    start = time.perf_counter()
+    menu.cleanup()
+    start = timer("cleanup", start)
+
+    create_dir(os.path.dirname(os.path.abspath(output)))
+    bWritten = write_myo(output, menu, name)
+    timer("export", start)
+
+    print("{:<10} {:8.3f}s".format("total", time.perf_counter() - total))
+    print(str(menu.animation_count()) + " animations " + ("written to " if bWritten else "unchanged in ") + output +
+          (" (" + str(duplicate) + " duplicates not added)" if duplicate else ""))
+    return 0
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -4,23 +4,30 @@
 import os
 import sys
 import logging
+import time
 import subprocess
-import xml.etree.ElementTree as ET
+import multiprocessing
 
 from enum import Enum
-from util.utils import indent, create_dir
+from util.utils import create_dir
+from util.MyoWriter import write_myo
 from util.Config import get_config, save_config
-from data.Animation import Animation
-from data.NamedContainer import NamedContainer
+from util import Timing
+from util.Logs import setup_logging, stop_logging, log_stats
+from data import ScanCache
 from widget.QuickyGui import *
 from widget.MainWindow import MainWindow
 from widget.AnimTreeWidget import AnimTreeWidget
+from widget.AnimTreeView import AnimTreeView
+from widget.ScanWorker import ScanWorker
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import (QApplication, QMessageBox, QFileDialog, QInputDialog,
                              QHBoxLayout, QVBoxLayout, QStyleFactory)
 
 
-# TODO Fix Selection Action when selecting multiple different level
+LOG_FILE = "logs.log"
+TIMING_REPORT = os.path.join(os.path.dirname(LOG_FILE), "timings.json")
+
 # TODO Automatically merged folder with the same name ?
 
 class COLOR(Enum):
@@ -42,6 +49,10 @@ class OSelectorWindow(MainWindow):
         elif sys.platform == "darwin":
             app.setStyle(QStyleFactory.create("macintosh"))
 
+        self.scanWorker = None
+        self.scanStart = 0
+        self.scanLogStats = None
+
         self.init_settings()
 
     def init_ui(self):
@@ -49,10 +60,13 @@ class OSelectorWindow(MainWindow):
         self.groupBoxScanning = create_group_box(self, "STEP I")
         self.buttonScan = create_button(self, "Scan Folder", self.scan_folder)
         self.buttonLoad = create_button(self, "Load plugin", self.load_xml)
+        self.buttonClearCache = create_button(self, "Clear Cache", self.clear_scan_cache)
+        self.buttonClearCache.setMaximumWidth(150)
 
         hbox = QHBoxLayout()
         hbox.addWidget(self.buttonScan)
         hbox.addWidget(self.buttonLoad)
+        hbox.addWidget(self.buttonClearCache)
         self.groupBoxScanning.setLayout(hbox)
 
         self.groupBoxAnalytics = create_group_box(self, "Analytics")
@@ -60,10 +74,25 @@ class OSelectorWindow(MainWindow):
         label_anims_checked = create_label(self, " Animations checked")
         self.lcdAnimsChecked = create_lcd(self)
 
+        self.labelTimings = create_label(self, "")
+        self.labelTimings.hide()
+
+        self.progressScan = create_progress_bar(self)
+        self.buttonCancelScan = create_button(self, "Cancel", self.cancel_scan)
+        self.progressScan.hide()
+        self.buttonCancelScan.hide()
+
+        vbox = QVBoxLayout()
         hbox = QHBoxLayout()
         hbox.addWidget(self.lcdAnimsChecked)
         hbox.addWidget(label_anims_checked)
-        self.groupBoxAnalytics.setLayout(hbox)
+        vbox.addItem(hbox)
+        vbox.addWidget(self.labelTimings)
+        hbox = QHBoxLayout()
+        hbox.addWidget(self.progressScan)
+        hbox.addWidget(self.buttonCancelScan)
+        vbox.addItem(hbox)
+        self.groupBoxAnalytics.setLayout(vbox)
 
         hbox = QHBoxLayout()
         hbox.addWidget(self.groupBoxScanning)
@@ -73,9 +102,20 @@ class OSelectorWindow(MainWindow):
 
         # ----- SECOND ROW : List animations files -----
         self.groupBoxAnim = create_group_box(self, "STEP II")
-        self.treeAnimFiles = AnimTreeWidget()
+        if get_config().getboolean("CONFIG", "bUseModelView", fallback=False):
+            self.treeAnimFiles = AnimTreeView()
+        else:
+            self.treeAnimFiles = AnimTreeWidget()
+        self.treeAnimFiles.animationCountChanged.connect(self.lcdAnimsChecked.display)
+
+        self.lineSearch = create_line_edit(self, "Search names, ids, files and objects", self.slot_search)
+        self.labelSearch = create_label(self, "")
 
         vbox = QVBoxLayout()
+        hbox = QHBoxLayout()
+        hbox.addWidget(self.lineSearch)
+        hbox.addWidget(self.labelSearch)
+        vbox.addItem(hbox)
         vbox.addWidget(self.treeAnimFiles)
 
         hbox = QHBoxLayout()
@@ -133,10 +173,26 @@ class OSelectorWindow(MainWindow):
             get_config().set("CONFIG", "bFirstTime", "False")
             save_config()
 
+    def closeEvent(self, event):
+        if self.scanWorker:
+            self.scanWorker.cancel()
+            self.scanWorker.wait()
+        super().closeEvent(event)
+
     def after_tree_built(self):
         self.treeAnimFiles.cleanup()
-        self.treeAnimFiles.itemClicked.connect(self.slot_lcd_display_anim_checked)
         self.slot_lcd_display_anim_checked()
+        self.report_timings()
+
+    def report_timings(self):
+        """ Show spans recorded since the last scan or load in the Analytics box, and write them next to the logs """
+        summary = Timing.summary()
+        if not summary:
+            return
+        self.labelTimings.setText(summary)
+        self.labelTimings.show()
+        logging.info("Timings :\n" + summary)
+        Timing.write_report(TIMING_REPORT)
 
     def toggle_window(self, state):
         self.groupBoxGenerate.setDisabled(not state)
@@ -152,6 +208,7 @@ class OSelectorWindow(MainWindow):
                                                get_config().get("PATHS", "pluginFolder"),
                                                "MyOsa file (*.myo)")
         if xml_file:
+            Timing.reset()
             logging.info("xml_file given : " + xml_file)
             logging.info("Loading")
 
@@ -168,86 +225,73 @@ class OSelectorWindow(MainWindow):
                                                     get_config().get("PATHS", "installFolder"),
                                                     QFileDialog.ShowDirsOnly)
 
-        counter = 0
-        packages = []
-        previous_package = ""
-        anim_package = None
-        max_item_string_length = get_config().getint("PLUGIN", "maxItemStringLength")
-
-        if scan_dir:
-
-            logging.info("=============== SCANNING ===============")
-            logging.info("Scanning directory : " + scan_dir)
-
-            for root, dirs, files in os.walk(scan_dir):
-                for file in files:
-                    if file.startswith("FNIS") and file.endswith("List.txt"):
-                        anim_file = os.path.join(root, file)
-                        module = file[5:-9]
-                        package = anim_file.replace(scan_dir + '\\', '').split('\\', 1)[0][slice(0, max_item_string_length)]
-                        if not package:
-                            package = module
-
-                        if package != previous_package:
-                            if anim_package:
-                                anim_package.items.sort(key=lambda x: x.name, reverse=False)
-                            anim_package = NamedContainer(package)
-                        anim_module = NamedContainer(module)
-
-                        logging.info(indent("Package : " + str(package), 1))
-                        logging.info(indent("Module  : " + str(module), 1))
-                        logging.info(indent("Reading : " + anim_file, 1))
-
-                        with open(anim_file, 'r') as f:
-                            anim = None
-                            for line in f:
-                                anim_type, anim_options, anim_id, anim_file, anim_obj = Animation.parse_line(line)
-
-                                logging.debug(indent("animType : " + anim_type.name + " || Line : " + line.strip(), 2))
-
-                                if anim_type == Animation.TYPE.BASIC:
-                                    anim = Animation(anim_package.name, anim_module.name, anim_type, anim_options, anim_id, anim_file, anim_obj)
-                                    anim_module.add_item(anim)
-                                    counter += 1
-                                    logging.info(indent("Adding basic animation || Line : " + line.strip(), 2))
-
-                                elif anim_type == Animation.TYPE.ANIM_OBJ:
-                                    anim = Animation(anim_package.name, anim_module.name, anim_type, anim_options, anim_id, anim_file, anim_obj)
-                                    anim_module.add_item(anim)
-                                    counter += 1
-                                    logging.info(indent("Adding AnimObj animation || Line : " + line.strip(), 2))
-
-                                elif anim_type == Animation.TYPE.SEQUENCE:
-                                    anim = Animation(anim_package.name, anim_module.name, anim_type, anim_options, anim_id, anim_file, anim_obj)
-                                    anim_module.add_item(anim)
-                                    counter += 1
-                                    logging.info(indent("Adding sequence animation || Line : " + line.strip(), 2))
-
-                                elif anim_type == Animation.TYPE.ADDITIVE:
-                                    anim.add_stage(anim_id, anim_file, anim_obj)
-                                    counter += 1
-                                    logging.info(indent("Adding stage || Line : " + line.strip(), 3))
-
-                        #anim_module.items.sort(key=lambda x: x.parse_name(), reverse=False)
-
-                        if anim_module.items:
-                            anim_package.add_item(anim_module)
-                            if package != previous_package:
-                                previous_package = package
-                                packages.append(anim_package)
-
-            packages.sort(key=lambda x: x.name, reverse=False)
-            duplicate = self.treeAnimFiles.create_from_packages(packages)
-
-            if duplicate > 0:
-                QMessageBox.information(self, "Results", str(duplicate) +
-                                        " duplicates found (Not added)\n"
-                                        "List (WARNING Level) available in logs (if activated)")
-
-            self.after_tree_built()
+        if not scan_dir:
+            self.toggle_window(True)
+            return
+
+        Timing.reset()
+        self.treeAnimFiles.begin_packages()
+
+        # Discovery, parsing and grouping run in a worker, packages are added to the tree as they come
+        self.scanWorker = ScanWorker(scan_dir, self)
+        self.scanWorker.catalogReady.connect(self.treeAnimFiles.add_catalog)
+        self.scanWorker.progress.connect(self.slot_scan_progress)
+        self.scanWorker.finished.connect(self.slot_scan_finished)
+
+        self.scanStart = time.perf_counter()
+        self.scanLogStats = log_stats()
+        self.progressScan.setRange(0, 0)
+        self.progressScan.setFormat("Discovering FNIS lists...")
+        self.progressScan.show()
+        self.buttonCancelScan.show()
+        self.scanWorker.start()
+
+    def cancel_scan(self):
+        if self.scanWorker:
+            self.buttonCancelScan.setDisabled(True)
+            self.scanWorker.cancel()
+
+    def slot_scan_progress(self, lists_read, lists_found, animations_read):
+        elapsed = max(time.perf_counter() - self.scanStart, 1e-6)
+        self.progressScan.setRange(0, max(lists_found, 1))
+        self.progressScan.setValue(lists_read)
+        self.progressScan.setFormat("%v/%m files - " +
+                                    str(int(lists_read / elapsed)) + " files/s - " +
+                                    str(int(animations_read / elapsed)) + " anims/s")
+
+    def slot_scan_finished(self):
+        worker = self.scanWorker
+        self.scanWorker = None
+
+        duplicate = self.treeAnimFiles.end_packages()
+        logging.info("Scan done in " + str(round(time.perf_counter() - self.scanStart, 2)) + "s : " +
+                     str(worker.listCount) + " lists, " + str(worker.animationCount) + " animations")
+        logging.info("Logs during scan : " + str(log_stats() - self.scanLogStats))
+
+        self.progressScan.hide()
+        self.buttonCancelScan.hide()
+        self.buttonCancelScan.setDisabled(False)
+
+        if worker.error:
+            QMessageBox.warning(self, "Scan failed", "Scan failed : " + str(worker.error) + "\n"
+                                "Tree only contains animations read before the error")
+        elif worker.cancelled:
+            QMessageBox.information(self, "Scan cancelled", "Scan cancelled, tree only contains animations read "
+                                                            "before cancelling")
+
+        if duplicate > 0:
+            QMessageBox.information(self, "Results", str(duplicate) +
+                                    " duplicates found (Not added)\n"
+                                    "List (WARNING Level) available in logs (if activated)")
 
+        self.after_tree_built()
         self.toggle_window(True)
 
+    def clear_scan_cache(self):
+        ScanCache.clear_cache()
+        logging.info("Scan cache cleared")
+        QMessageBox.information(self, "Scan cache", "Scan cache cleared, next scan will read every FNIS list")
+
     def set_install_folder(self):
         folder = get_config().get("PATHS", "installFolder")
         if folder:
@@ -264,6 +308,15 @@ class OSelectorWindow(MainWindow):
         save_config()
         return str(folder)
 
+    def slot_search(self, text):
+        found = self.treeAnimFiles.search(text)
+        if len(text) < self.treeAnimFiles.SEARCH_MIN_LENGTH:
+            self.labelSearch.setText("")
+        elif found >= self.treeAnimFiles.SEARCH_LIMIT:
+            self.labelSearch.setText(str(found) + "+ found")
+        else:
+            self.labelSearch.setText(str(found) + " found")
+
     def slot_lcd_display_anim_checked(self):
         self.lcdAnimsChecked.display(self.treeAnimFiles.animation_count())
 
@@ -303,16 +356,14 @@ class OSelectorWindow(MainWindow):
 
                 logging.info("Plugin destination : " + path_plugin_folder)
 
-                xml_root = self.treeAnimFiles.to_xml(plugin_name)
-
-                with open(path_plugin_folder + plugin_name + ".myo", "w") as file:
-                    data = ET.tostring(xml_root, "unicode")
-                    file.write(data)
+                bWritten = write_myo(path_plugin_folder + plugin_name + ".myo", self.treeAnimFiles, plugin_name)
+                self.report_timings()
 
                 msg_box = QMessageBox()
                 msg_box.setWindowTitle("Results")
                 msg_box.setIcon(QMessageBox.Information)
-                msg_box.setText("Plugin Generation Done !\n"
+                msg_box.setText(("Plugin Generation Done !\n" if bWritten else
+                                 "Plugin unchanged since last generation, nothing written\n") +
                                 "----- Plugin path -----\n" +
                                 path_plugin_folder)
                 msg_box.addButton(QPushButton("Open Folder"), QMessageBox.ActionRole)
@@ -327,18 +378,18 @@ class OSelectorWindow(MainWindow):
 
 
 if __name__ == '__main__':
-    logging.basicConfig(filemode="w",
-                        filename="logs.log",
-                        level=logging.getLevelName(get_config().get("LOG", "level")),
-                        format='%(asctime)s - [%(levelname)s] - %(name)s : %(message)s',
-                        datefmt='%m/%d/%Y %I:%M:%S %p')
+    multiprocessing.freeze_support()
 
-    if not get_config().get("LOG", "enabled"):
-        logger = logging.getLogger()
-        logger.disabled = True
+    setup_logging(LOG_FILE,
+                  level=logging.getLevelName(get_config().get("LOG", "level")),
+                  enabled=get_config().getboolean("LOG", "enabled", fallback=True),
+                  use_queue=get_config().getboolean("LOG", "bUseQueue", fallback=True))
+    Timing.set_enabled(get_config().getboolean("LOG", "bTimings", fallback=True))
 
     logging.info(" =============== STARTING LOGGING ===============")
 
     app = QApplication(sys.argv)
     window = OSelectorWindow()
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    stop_logging()
+    sys.exit(exit_code)
@@ -0,0 +1,113 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Memory held by a synthetic scan result, compared to the Animation layout used before slots and interning.
+Names are built the way a scan builds them : a new string object for every line read.
+
+Usage : python benchmark/bench_memory.py [animations]
+"""
+
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from data.Animation import Animation
+from data.NamedContainer import NamedContainer
+
+MODULES_PER_PACKAGE = 10
+ANIMATIONS_PER_MODULE = 100
+ANIM_OBJECTS = ("", " AnimObjectChair", " AnimObjectBall", " AnimObjectStocks AnimObjectBall")
+
+
+class LegacyAnimation:
+    """ Animation as it was before __slots__ and interning, kept as a reference point """
+
+    def __init__(self, package="", module="", _type=Animation.TYPE.UNKNOWN, options=None, animId="", animFile="", animObj=""):
+        if not options:
+            options = []
+
+        self.package = package
+        self.module = module
+        self.type = _type
+        self.options = options
+
+        self.stages = []
+        self.stages_file = []
+        self.stages_obj = []
+
+        self.stages.append(animId)
+        self.stages_file.append(animFile)
+        self.stages_obj.append(animObj)
+
+    def add_stage(self, animId, animFile, animObj):
+        self.stages.append(animId)
+        self.stages_file.append(animFile)
+        self.stages_obj.append(animObj)
+
+
+class LegacyNamedContainer:
+
+    def __init__(self, name):
+        self.name = name
+        self.items = []
+
+    def add_item(self, item):
+        self.items.append(item)
+
+
+def copy(string):
+    """ :return: a distinct string object equal to string, as a line of a file would give """
+    return "".join(list(string))
+
+
+def build(animation_cls, container_cls, count):
+    packages = []
+    index = 0
+    while index < count:
+        package_name = "Package" + str(len(packages))
+        package = container_cls(package_name)
+        for m in range(MODULES_PER_PACKAGE):
+            module_name = "module" + str(m)
+            module = container_cls(module_name)
+            for a in range(ANIMATIONS_PER_MODULE):
+                if index >= count:
+                    break
+                anim_id = "%s_%s_A%d_S1" % (package_name, module_name, a)
+                animation = animation_cls(copy(package_name), copy(module_name), Animation.TYPE.SEQUENCE,
+                                          [Animation.OPTION.ACYCLIC], anim_id, anim_id + ".hkx",
+                                          copy(ANIM_OBJECTS[a % len(ANIM_OBJECTS)]))
+                # One animation out of two has a second stage
+                if a % 2:
+                    stage_id = anim_id[:-1] + "2"
+                    animation.add_stage(stage_id, stage_id + ".hkx", copy(ANIM_OBJECTS[a % len(ANIM_OBJECTS)]))
+                module.add_item(animation)
+                index += 1
+            package.add_item(module)
+        packages.append(package)
+    return packages
+
+
+def measure(animation_cls, container_cls, count):
+    tracemalloc.start()
+    packages = build(animation_cls, container_cls, count)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del packages
+    return size
+
+
+def main(count=100000):
+    legacy = measure(LegacyAnimation, LegacyNamedContainer, count)
+    current = measure(Animation, NamedContainer, count)
+
+    print("animations : %d" % count)
+    print("legacy     : %8.1f MB (%d bytes per animation)" % (legacy / 2 ** 20, legacy // count))
+    print("current    : %8.1f MB (%d bytes per animation, -%.0f%%)" % (current / 2 ** 20, current // count,
+                                                                       100 * (1 - current / legacy)))
+    return current < legacy
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main(*[int(arg) for arg in sys.argv[1:]]) else 1)
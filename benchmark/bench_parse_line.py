@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Throughput of Animation.parse_line, compared to the parser shipped before it was precompiled.
+
+Usage : python benchmark/bench_parse_line.py [lines]
+"""
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from data.Animation import Animation
+
+# Minimum throughput expected from Animation.parse_line, in lines per second
+TARGET_LINES_PER_SECOND = 200000
+
+SAMPLE_LINES = ["' FNIS list header comment\n",
+                "\n",
+                "b -a,Tn ZaZAPCFemSittingAnim_01 ZaZAPCFemSittingAnim_01.hkx\n",
+                "s -a,B1.2 ZaZAPCHorFB_01_S1 ZaZAPCHorFB_01_S1.hkx\n",
+                "+ -a ZaZAPCHorFB_01_S2 ZaZAPCHorFB_01_S2.hkx\n",
+                "+ -o,a,D3.5 ZaZAPCHorFB_01_S3 ZaZAPCHorFB_01_S3.hkx AnimObjectChair\n",
+                "fu -o,Tcall/1.5 ZaZAPCStocks_01 ZaZAPCStocks_01.hkx AnimObjectStocks AnimObjectBall\n",
+                "pa -h ZaZAPCPaired_01 ZaZAPCPaired_01.hkx\n"]
+
+
+def legacy_parse_line(line):
+    """ Parser as it was before the precompiled engine, kept as a reference point """
+    regexp = re.compile(r"^(\S*)(?: -(\S*))? (\S*) (\S*)((?:\s(?:\S*))*)")
+    found = regexp.search(line)
+    if found:
+        anim_type = Animation.TYPE.UNKNOWN
+        for animType in Animation.TYPE:
+            if re.compile(animType.value).search(found.group(1)):
+                anim_type = animType
+                break
+        if found.group(2):
+            for animOptions in Animation.OPTION:
+                re.compile(animOptions.value).search(found.group(2))
+        return anim_type, [Animation.OPTION.NONE], found.group(3), found.group(4), found.group(5)
+    return Animation.TYPE.UNKNOWN, [], "", "", ""
+
+
+def measure(parse, lines):
+    start = time.perf_counter()
+    for line in lines:
+        parse(line)
+    return len(lines) / (time.perf_counter() - start)
+
+
+def main(count=200000):
+    lines = (SAMPLE_LINES * (count // len(SAMPLE_LINES) + 1))[:count]
+
+    legacy = measure(legacy_parse_line, lines)
+    current = measure(Animation.parse_line, lines)
+
+    print("legacy  : %12.0f lines/s" % legacy)
+    print("current : %12.0f lines/s (x%.1f)" % (current, current / legacy))
+    print("target  : %12.0f lines/s -> %s" % (TARGET_LINES_PER_SECOND,
+                                              "OK" if current >= TARGET_LINES_PER_SECOND else "FAILED"))
+    return current >= TARGET_LINES_PER_SECOND
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main(*[int(arg) for arg in sys.argv[1:]]) else 1)
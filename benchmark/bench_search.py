@@ -0,0 +1,128 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Latency of the search box on a generated corpus (see generate_corpus.py) : every query is typed one character
+at a time, and each keystroke is one SearchIndex.search. A trigram index is measured as a reference point.
+
+Usage : python benchmark/bench_search.py [animations]
+"""
+
+import os
+import sys
+import time
+import shutil
+import logging
+import tempfile
+from array import array
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from data import Scanner
+from data.Menu import Menu
+from data.SearchIndex import SearchIndex
+from widget.AnimTreeView import AnimTreeView
+from generate_corpus import generate
+
+# One frame at 60 Hz, the longest a keystroke may take
+TARGET_KEYSTROKE_MS = 16.7
+
+# Typed in the search box, from frequent names to ones matching nothing
+TYPED_QUERIES = ("sitting", "zaz12_0bow", "animobjectchair", ".hkx", "_s2", "zzzz", "qx")
+
+# Runs of every keystroke, the fastest is kept
+REPEAT = 5
+
+
+class TrigramIndex:
+    """ Entries by the trigrams of their text, kept as a reference point """
+
+    def __init__(self):
+        self.keys = []
+        self.texts = []
+        self.postings = {}
+
+    def add(self, key, texts):
+        slot = len(self.keys)
+        text = SearchIndex.normalize(texts)
+        self.keys.append(key)
+        self.texts.append(text)
+        for trigram in set(map("".join, zip(text, text[1:], text[2:]))):
+            postings = self.postings.get(trigram)
+            if postings is None:
+                postings = self.postings[trigram] = array('I')
+            postings.append(slot)
+
+    def search(self, query, limit=None):
+        query = query.lower()
+        trigrams = [query[i:i + 3] for i in range(len(query) - 2)]
+        if trigrams:
+            # Entries having the rarest trigram of the query, checked against the whole query
+            candidates = min((self.postings.get(trigram, ()) for trigram in trigrams), key=len)
+        else:
+            candidates = range(len(self.keys))
+
+        found = []
+        texts = self.texts
+        for slot in candidates:
+            if query in texts[slot]:
+                found.append(self.keys[slot])
+                if limit is not None and len(found) >= limit:
+                    break
+        return found
+
+
+def build(index_class, entries):
+    """ :return: (index of entries, build time in seconds) """
+    start = time.perf_counter()
+    index = index_class()
+    for node, texts in entries:
+        index.add(node, texts)
+    return index, time.perf_counter() - start
+
+
+def worst_keystroke(index):
+    """ :return: (time in ms, text typed) of the slowest keystroke """
+    worst = (0, "")
+    for query in TYPED_QUERIES:
+        for length in range(AnimTreeView.SEARCH_MIN_LENGTH, len(query) + 1):
+            text = query[:length]
+            best = None
+            for i in range(REPEAT):
+                start = time.perf_counter()
+                index.search(text, AnimTreeView.SEARCH_LIMIT)
+                elapsed = (time.perf_counter() - start) * 1000
+                best = elapsed if best is None else min(best, elapsed)
+            worst = max(worst, (best, text))
+    return worst
+
+
+def main(count=120000):
+    logging.disable(logging.WARNING)
+    corpus_dir = tempfile.mkdtemp(prefix="oselector_corpus_")
+    try:
+        generate(corpus_dir, count)
+        discovery = Scanner.discover_lists(corpus_dir)
+        packages = Scanner.group_packages(discovery.entries, Scanner.read_lists(discovery.entries))
+    finally:
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    menu = Menu()
+    menu.add_packages(packages)
+    entries = [(node, AnimTreeView.search_texts(node)) for node in menu.root.iter_subtree() if not node.is_root]
+    print("entries     : %d" % len(entries))
+
+    results = []
+    for name, index_class in (("trigram", TrigramIndex), ("current", SearchIndex)):
+        index, build_time = build(index_class, entries)
+        keystroke, text = worst_keystroke(index)
+        print("%-11s : build %6.2fs, slowest keystroke %6.2f ms (%r)" % (name, build_time, keystroke, text))
+        results.append(keystroke)
+
+    current = results[-1]
+    print("target      : %6.2f ms per keystroke -> %s" % (TARGET_KEYSTROKE_MS,
+                                                          "OK" if current <= TARGET_KEYSTROKE_MS else "FAILED"))
+    return current <= TARGET_KEYSTROKE_MS
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main(*[int(arg) for arg in sys.argv[1:]]) else 1)
@@ -0,0 +1,243 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Time every step from FNIS lists to a plugin and back, on a generated corpus (see generate_corpus.py) or on a
+real mods folder. Qt runs headless. Results are written as JSON, and can be compared with a previous run.
+
+Usage : python benchmark/bench_suite.py [-s 14k] [-c corpus_dir] [-r 3] [-o results.json] [--compare old.json]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from PyQt5.QtCore import QT_VERSION_STR, QItemSelection, QItemSelectionModel
+from PyQt5.QtWidgets import QApplication
+
+from data import Scanner
+from data.Animation import Animation
+from util.MyoWriter import write_myo
+from widget.AnimTreeWidget import AnimTreeWidget
+from generate_corpus import SIZES, parse_size, generate
+
+STAGES = ("parse_line", "discovery", "read_lists", "aggregation", "create_from_packages", "cleanup", "search",
+          "to_xml", "write_myo", "create_from_xml", "edits")
+
+# Typed in the search box one after the other, the last one matching nothing
+SEARCH_QUERIES = ("si", "sit", "sitting", "_s2", ".hkx", "zzzz")
+
+# Animations selected for each structural edit : insert parent, move up, then remove
+EDIT_SELECTION = 2000
+
+
+class Timer:
+    """ Wall and CPU time of a block """
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, *args):
+        self.wall = time.perf_counter() - self.wall
+        self.cpu = time.process_time() - self.cpu
+
+
+def tree_size(tree):
+    """ :return: number of items of an AnimTreeWidget """
+    count = 0
+    stack = [tree.invisibleRootItem()]
+    while stack:
+        item = stack.pop()
+        count += item.childCount()
+        stack.extend(item.child(i) for i in range(item.childCount()))
+    return count
+
+
+def select_animations(tree, count):
+    """ Select the first count animations of an AnimTreeWidget, depth first, in a single selection change """
+    selection = QItemSelection()
+    stack = [tree.invisibleRootItem()]
+    while stack and count:
+        item = stack.pop()
+        if item.text(AnimTreeWidget.COLUMN.ID.value):
+            index = tree.indexFromItem(item)
+            selection.select(index, index)
+            count -= 1
+        stack.extend(item.child(i) for i in reversed(range(item.childCount())))
+    tree.selectionModel().select(selection, QItemSelectionModel.ClearAndSelect | QItemSelectionModel.Rows)
+
+
+def run_once(corpus, work_dir):
+    """ :return: dict of stage name -> {"wall", "cpu", counts...} for one pass over the corpus """
+    results = {}
+
+    def record(name, timer, **counts):
+        results[name] = dict(wall=timer.wall, cpu=timer.cpu, **counts)
+
+    with Timer() as timer:
+        discovery = Scanner.discover_lists(corpus)
+    record("discovery", timer, lists=len(discovery.entries), visited=discovery.visited, pruned=discovery.pruned)
+
+    lines = []
+    for path, package, module in discovery.entries:
+        with open(path, "r") as f:
+            lines.extend(f)
+    with Timer() as timer:
+        for line in lines:
+            Animation.parse_line(line)
+    record("parse_line", timer, lines=len(lines))
+
+    with Timer() as timer:
+        results_lists = Scanner.read_lists(discovery.entries)
+    record("read_lists", timer, lists=len(results_lists), workers=Scanner.get_worker_count())
+
+    with Timer() as timer:
+        packages = Scanner.group_packages(discovery.entries, results_lists)
+    record("aggregation", timer, packages=len(packages))
+
+    tree = AnimTreeWidget()
+    with Timer() as timer:
+        duplicates = tree.create_from_packages(packages)
+    record("create_from_packages", timer, items=tree_size(tree), animations=tree.animation_count(),
+           duplicates=duplicates)
+
+    with Timer() as timer:
+        tree.cleanup()
+    record("cleanup", timer, items=tree_size(tree))
+
+    with Timer() as timer:
+        found = sum(len(tree.searchIndex.search(query, tree.SEARCH_LIMIT)) for query in SEARCH_QUERIES)
+    record("search", timer, queries=len(SEARCH_QUERIES), found=found)
+
+    with Timer() as timer:
+        tree.to_xml("Benchmark")
+    record("to_xml", timer)
+
+    myo_file = os.path.join(work_dir, "Benchmark.myo")
+    with Timer() as timer:
+        write_myo(myo_file, tree, "Benchmark")
+    record("write_myo", timer, bytes=os.path.getsize(myo_file))
+
+    loaded = AnimTreeWidget()
+    with Timer() as timer:
+        added = loaded.create_from_xml(myo_file)
+    record("create_from_xml", timer, items=tree_size(loaded), animations=added)
+
+    with Timer() as timer:
+        for action in (loaded.action_insert_parent, loaded.action_move_up, loaded.action_remove_from_parent):
+            select_animations(loaded, EDIT_SELECTION)
+            action()
+    record("edits", timer, selected=EDIT_SELECTION, items=tree_size(loaded))
+
+    tree.clear()
+    loaded.clear()
+    return results
+
+
+def run(corpus, repeat):
+    """ :return: dict of stage name -> best run of the stage, with wall times of every run """
+    runs = {name: [] for name in STAGES}
+    with tempfile.TemporaryDirectory() as work_dir:
+        for i in range(repeat):
+            for name, result in run_once(corpus, work_dir).items():
+                runs[name].append(result)
+
+    best = {}
+    for name in STAGES:
+        best[name] = dict(min(runs[name], key=lambda result: result["wall"]))
+        best[name]["runs"] = [result["wall"] for result in runs[name]]
+    return best
+
+
+def git_revision():
+    """ :return: commit of the benchmarked tree, or "" when it is not a git checkout """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def compare(previous, current):
+    """ Print wall times of both runs, stage by stage """
+    print()
+    print("%-22s %10s %10s %8s" % ("stage", previous.get("revision", "before"), current.get("revision", "now"), ""))
+    for name in STAGES:
+        before = previous["stages"].get(name, {}).get("wall")
+        now = current["stages"][name]["wall"]
+        if before:
+            print("%-22s %9.3fs %9.3fs %7.2fx" % (name, before, now, now / before))
+        else:
+            print("%-22s %10s %9.3fs" % (name, "-", now))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OSelector from FNIS lists to a plugin and back")
+    parser.add_argument("-s", "--size", default="1k",
+                        help="Size of the generated corpus : " + ", ".join(SIZES) + " or a number of animations")
+    parser.add_argument("-c", "--corpus", help="Folder to scan instead of a generated corpus")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generated corpus")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Runs of every stage, the fastest is kept")
+    parser.add_argument("-o", "--output", help="JSON file to write results to")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare with")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    app = QApplication(sys.argv[:1])
+
+    corpus_dir = None
+    corpus = args.corpus
+    if not corpus:
+        corpus_dir = tempfile.mkdtemp(prefix="oselector_corpus_")
+        list_count, written = generate(corpus_dir, parse_size(args.size), args.seed)
+        print("Generated %d FNIS lists, %d animations" % (list_count, written))
+        corpus = corpus_dir
+
+    try:
+        stages = run(corpus, max(args.repeat, 1))
+    finally:
+        if corpus_dir:
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    results = {"revision": git_revision(),
+               "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+               "corpus": args.corpus or args.size,
+               "seed": args.seed,
+               "repeat": args.repeat,
+               "python": platform.python_version(),
+               "qt": QT_VERSION_STR,
+               "platform": platform.platform(),
+               "stages": stages}
+
+    for name, stage in stages.items():
+        counts = ", ".join(key + "=" + str(value) for key, value in stage.items()
+                           if key not in ("wall", "cpu", "runs"))
+        print("%-22s %9.3fs wall %9.3fs cpu  %s" % (name, stage["wall"], stage["cpu"], counts))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print("Results written to " + args.output)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            compare(json.load(f), results)
+
+    del app
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,149 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Write a synthetic mod folder, laid out like a Mod Organizer mods/ folder :
+<Mod>/meshes/actors/character/animations/<mod>/FNIS_<mod>_List.txt, next to textures/ and scripts/ folders.
+Lists mix basic (b), sequence (s + stages), furniture / object (fu, o) animations with options, comments, blank
+lines and lines OSelector ignores (pa, km). A few animations of each mod reuse ids of the previous mod, as
+patches and re-uploads do, so duplicates are found too.
+The same size and seed always give the same files.
+
+Usage : python benchmark/generate_corpus.py <destination> [1k|14k|100k|1M|<animations>] [seed]
+"""
+
+import os
+import sys
+import random
+
+# Animations, counted as menu entries (one per animation stage)
+SIZES = {"1k": 1000, "14k": 14000, "100k": 100000, "1M": 1000000}
+
+LISTS_PER_MOD = (1, 4)
+ANIMATIONS_PER_LIST = (20, 400)
+STAGES_PER_SEQUENCE = (2, 6)
+# Part of the animations of a mod reusing ids of the previous one
+DUPLICATE_RATIO = 0.01
+
+AUTHORS = ("ZaZ", "Leito", "Anub", "Billyy", "FunnyBizness", "Nibbles", "Baka", "Mitos", "Rydin", "Arrok")
+ACTIONS = ("Sitting", "Kneeling", "Dancing", "Laying", "Stocks", "Pillory", "Cuddle", "Wave", "Bow", "Idle")
+ANIM_OBJECTS = ("AnimObjectChair", "AnimObjectBall", "AnimObjectStocks", "AnimObjectPillory", "AnimObjectCup")
+HEADERS = ("' FNIS animation list generated for benchmarks\n",
+           "'-------------------------------------------------\n",
+           "Version V1.0\n",
+           "\n")
+
+
+def parse_size(size):
+    """ :return: number of animations of a size name, or of a plain number """
+    return SIZES[size] if size in SIZES else int(size)
+
+
+def options(rng, *extra):
+    """ :return: option string of a line, like " -a,Tn", or "" """
+    chosen = [option for option in extra if option]
+    if rng.random() < 0.7:
+        chosen.append("a")
+    if rng.random() < 0.2:
+        chosen.append("Tn")
+    if rng.random() < 0.1:
+        chosen.append("B%.1f" % rng.uniform(0.5, 3))
+    if rng.random() < 0.05:
+        chosen.append("h")
+    return " -" + ",".join(chosen) if chosen else ""
+
+
+def list_lines(rng, prefix, count, reused):
+    """
+    Lines of a FNIS list holding count animation entries
+    :param reused: ids of the previous mod, some of them are written again
+    :return: (lines, ids written)
+    """
+    lines = list(HEADERS)
+    ids = []
+    index = 0
+    while len(ids) < count:
+        roll = rng.random()
+        index += 1
+        if reused and roll < DUPLICATE_RATIO:
+            anim_id = rng.choice(reused)
+            lines.append("b" + options(rng) + " " + anim_id + " " + anim_id + ".hkx\n")
+            ids.append(anim_id)
+        elif roll < 0.35:
+            stages = min(rng.randint(*STAGES_PER_SEQUENCE), count - len(ids))
+            name = "%s%s%d" % (prefix, rng.choice(ACTIONS), index)
+            for stage in range(1, stages + 1):
+                anim_id = "%s_%02d_S%d" % (name, index % 100, stage)
+                obj = " " + rng.choice(ANIM_OBJECTS) if rng.random() < 0.15 else ""
+                line_type = "s" if stage == 1 else "+"
+                lines.append(line_type + options(rng, "o" if obj else "") + " " + anim_id + " " + anim_id + ".hkx" +
+                             obj + "\n")
+                ids.append(anim_id)
+        elif roll < 0.5:
+            anim_id = "%s%sFurniture_%02d_A%d" % (prefix, rng.choice(ACTIONS), index % 100, index)
+            objects = rng.sample(ANIM_OBJECTS, rng.randint(1, 2))
+            lines.append(rng.choice(("fu", "o")) + options(rng, "o") + " " + anim_id + " " + anim_id + ".hkx " +
+                         " ".join(objects) + "\n")
+            ids.append(anim_id)
+        elif roll < 0.53:
+            lines.append("' " + rng.choice(ACTIONS) + " animations\n")
+        elif roll < 0.55:
+            lines.append("\n")
+        elif roll < 0.57:
+            anim_id = "%sPaired_%02d_A%d" % (prefix, index % 100, index)
+            lines.append(rng.choice(("pa", "km")) + " -h " + anim_id + " " + anim_id + ".hkx\n")
+        else:
+            anim_id = "%s%s_%02d_A%d" % (prefix, rng.choice(ACTIONS), index % 100, index)
+            lines.append("b" + options(rng) + " " + anim_id + " " + anim_id + ".hkx\n")
+            ids.append(anim_id)
+    return lines, ids
+
+
+def generate(destination, animations, seed=0):
+    """
+    Write a corpus of about animations entries in destination
+    :return: (number of FNIS lists written, number of animation entries written)
+    """
+    rng = random.Random(seed)
+    list_count = 0
+    written = 0
+    reused = []
+    mod_index = 0
+    while written < animations:
+        author = AUTHORS[mod_index % len(AUTHORS)]
+        mod_name = "%s Animation Pack %d" % (author, mod_index)
+        mod_dir = os.path.join(destination, mod_name)
+        for other in ("textures", "scripts"):
+            os.makedirs(os.path.join(mod_dir, other), exist_ok=True)
+
+        ids = []
+        for list_index in range(rng.randint(*LISTS_PER_MOD)):
+            if written >= animations:
+                break
+            module = "%s%d_%d" % (author, mod_index, list_index)
+            list_dir = os.path.join(mod_dir, "meshes", "actors", "character", "animations", module)
+            os.makedirs(list_dir, exist_ok=True)
+
+            count = min(rng.randint(*ANIMATIONS_PER_LIST), animations - written)
+            lines, list_ids = list_lines(rng, module, count, reused)
+            with open(os.path.join(list_dir, "FNIS_" + module + "_List.txt"), "w") as f:
+                f.writelines(lines)
+            ids.extend(list_ids)
+            written += len(list_ids)
+            list_count += 1
+
+        reused = ids
+        mod_index += 1
+    return list_count, written
+
+
+def main(destination, size="1k", seed=0):
+    list_count, written = generate(destination, parse_size(size), int(seed))
+    print("%d FNIS lists, %d animations written in %s" % (list_count, written, destination))
+    return True
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(2)
+    sys.exit(0 if main(*sys.argv[1:]) else 1)
@@ -1,5 +1,5 @@
 import re
-from util.Config import get_config
+import sys
 from enum import Enum
 
 
@@ -28,27 +28,35 @@ class Animation:
         TRIGGER = "(?:,|-)(T[^\/]*\/\d*\.\d*)"
         NONE = ""
 
-    def __init__(self, package="", module="", _type=TYPE.UNKNOWN, options=None, animId="", animFile="", animObj=""):
-        if not options:
-            options = []
+    # No per-instance dict : a scan keeps hundreds of thousands of them
+    __slots__ = ("package", "module", "type", "options", "stages", "stages_file", "stages_obj")
 
-        self.package = package
-        self.module = module
+    def __init__(self, package="", module="", _type=TYPE.UNKNOWN, options=None, animId="", animFile="", animObj=""):
+        # Names repeated over a whole package are shared instead of copied.
+        # Interned strings are freed with the last animation using them, so clearing or rescanning releases them
+        self.package = sys.intern(package)
+        self.module = sys.intern(module)
         self.type = _type
-        self.options = options
-
-        self.stages = []
-        self.stages_file = []
-        self.stages_obj = []
+        self.options = tuple(options) if options else ()
 
-        self.stages.append(animId)
-        self.stages_file.append(animFile)
-        self.stages_obj.append(animObj)
+        self.stages = (animId,)
+        self.stages_file = (animFile,)
+        self.stages_obj = (sys.intern(animObj),)
 
     def add_stage(self, animId, animFile, animObj):
-        self.stages.append(animId)
-        self.stages_file.append(animFile)
-        self.stages_obj.append(animObj)
+        self.stages += (animId,)
+        self.stages_file += (animFile,)
+        self.stages_obj += (sys.intern(animObj),)
+
+    def __getstate__(self):
+        return self.package, self.module, self.type, self.options, self.stages, self.stages_file, self.stages_obj
+
+    def __setstate__(self, state):
+        # Unpickled names (from a worker process) are interned as well
+        package, module, self.type, self.options, self.stages, self.stages_file, stages_obj = state
+        self.package = sys.intern(package)
+        self.module = sys.intern(module)
+        self.stages_obj = tuple(sys.intern(obj) for obj in stages_obj)
 
     def parse_name(self):
         return self.stages[0].rsplit("_", 2)[0]
@@ -60,34 +68,69 @@ class Animation:
     @staticmethod
     def parse_line(line):
         # See FNIS_FNISBase_List.txt for more information (in FNIS Behavior folder)
-        regexp = re.compile(r"^(\S*)(?: -(\S*))? (\S*) (\S*)((?:\s(?:\S*))*)")
-        found = regexp.search(line)
+        found = _LINE_REGEXP.match(line)
         if found:
-            anim_type = found.group(1)  # Single word (s + b ...)
-            anim_options = found.group(2)  # o,a,Tn,B.2, ...
-            anim_id = found.group(3)  # ANIM_ID_ ...
-            anim_file = found.group(4)  # <path/to/file>.hkx
-            anim_obj = found.group(5)  # Chair Ball ...
+            anim_type, anim_options, anim_id, anim_file, anim_obj = found.groups()
+            # anim_type    : Single word (s + b ...)
+            # anim_options : o,a,Tn,B.2, ...
+            # anim_id      : ANIM_ID_ ...
+            # anim_file    : <path/to/file>.hkx
+            # anim_obj     : Chair Ball ...
             return Animation.get_anim_type_from_string(anim_type), Animation.get_options_from_string(
                 anim_options), anim_id, anim_file, anim_obj
         return Animation.TYPE.UNKNOWN, [], "", "", ""
 
     @staticmethod
     def get_anim_type_from_string(string):
-        for animType in Animation.TYPE:
-            regexp = re.compile(animType.value)
-            found = regexp.search(string)
-            if found:
-                return animType
+        # Candidates are tried in TYPE declaration order, so "so" is still a SEQUENCE and "ofa" an ANIM_OBJ
+        for prefix, anim_type in _TYPE_DISPATCH.get(string[:1], ()):
+            if string.startswith(prefix):
+                return anim_type
         return Animation.TYPE.UNKNOWN
 
     @staticmethod
     def get_options_from_string(string):
-        if string:
-            options = []
-            for animOptions in Animation.OPTION:
-                regexp = re.compile(animOptions.value)
-                found = regexp.search(string)
-                if found:
-                    options.append(animOptions)
-        return [Animation.OPTION.NONE]
\ No newline at end of file
+        """
+        Parse a comma separated list of FNIS options (the part following the dash, like "a,o,B1.2")
+        :return: list of OPTION found in the string, in order of appearance
+        """
+        if not string:
+            return []
+        return [_OPTIONS[found.lastgroup] for found in _OPTION_REGEXP.finditer(string)]
+
+
+# Parser engine, compiled once at import. Bump PARSER_VERSION whenever the parsing result changes.
+PARSER_VERSION = 2
+
+_LINE_REGEXP = re.compile(r"^(\S*)(?: -(\S*))? (\S*) (\S*)((?:\s(?:\S*))*)")
+
+# First character of the type word -> (prefix, TYPE) candidates, in TYPE declaration order
+_TYPE_PREFIXES = ((Animation.TYPE.BASIC, ("b",)),
+                  (Animation.TYPE.ANIM_OBJ, ("fu", "fuo", "o")),
+                  (Animation.TYPE.SEQUENCE, ("s", "so")),
+                  (Animation.TYPE.ADDITIVE, ("+",)),
+                  (Animation.TYPE.OFFSET, ("ofa",)),
+                  (Animation.TYPE.PAIRED, ("pa",)),
+                  (Animation.TYPE.KILLMOVE, ("km",)))
+
+_TYPE_DISPATCH = {}
+for _anim_type, _prefixes in _TYPE_PREFIXES:
+    for _prefix in _prefixes:
+        _TYPE_DISPATCH.setdefault(_prefix[0], []).append((_prefix, _anim_type))
+
+# One alternative per OPTION, each option being a whole comma separated token
+_OPTION_PATTERNS = ((Animation.OPTION.ACYCLIC, r"a"),
+                    (Animation.OPTION.ANIM_OBJ, r"o"),
+                    (Animation.OPTION.TRANSITION, r"Tn"),
+                    (Animation.OPTION.HEAD_TRACKING, r"h"),
+                    (Animation.OPTION.BLEND_TIME, r"B\d*\.\d*"),
+                    (Animation.OPTION.KNOWN, r"k"),
+                    (Animation.OPTION.BSA, r"bsa"),
+                    (Animation.OPTION.STICKY_AO, r"st"),
+                    (Animation.OPTION.DURATION, r"D\d*\.\d*"),
+                    (Animation.OPTION.TRIGGER, r"T[^/,]*/\d*\.\d*"))
+
+_OPTIONS = {option.name: option for option, _pattern in _OPTION_PATTERNS}
+_OPTION_REGEXP = re.compile(r"(?:^|(?<=,))(?:" +
+                            "|".join("(?P<" + option.name + ">" + pattern + ")" for option, pattern in _OPTION_PATTERNS) +
+                            r")(?=,|$)")
@@ -0,0 +1,247 @@
+from array import array
+from itertools import accumulate, chain, compress, islice
+
+import logging
+log = logging.getLogger(__name__)
+
+from data.Animation import Animation
+from util import Timing
+
+# Column codes, positions in the enums
+TYPES = list(Animation.TYPE)
+OPTIONS = list(Animation.OPTION)
+_TYPE_CODES = {anim_type: code for code, anim_type in enumerate(TYPES)}
+_OPTION_BITS = {option: 1 << code for code, option in enumerate(OPTIONS)}
+
+# Option bitmasks are stored as byte planes : plane i holds bits 8 * i to 8 * i + 7 of each mask
+OPTION_PLANES = (len(OPTIONS) + 7) // 8
+
+
+def option_mask(options):
+    """ :return: bitmask of an iterable of Animation.OPTION """
+    mask = 0
+    for option in options:
+        mask |= _OPTION_BITS[option]
+    return mask
+
+
+def _byte_table(predicate):
+    """ :return: bytes.translate table mapping each byte value to 1 if predicate holds, else 0 """
+    return bytes(1 if predicate(value) else 0 for value in range(256))
+
+
+class StringTable:
+    """ Distinct strings, each one stored once and referenced by its index """
+
+    __slots__ = ("codes", "_strings")
+
+    def __init__(self):
+        # Strings by index, in the order they were added
+        self.codes = {}
+        self._strings = None
+
+    def add(self, string):
+        """ :return: index of string, added if needed """
+        self._strings = None
+        return self.codes.setdefault(string, len(self.codes))
+
+    def add_all(self, strings):
+        """ :return: list of the index of each string, added if needed """
+        self._strings = None
+        codes = self.codes
+        add = codes.setdefault
+        return [add(string, len(codes)) for string in strings]
+
+    def code(self, string):
+        """ :return: index of string, -1 if not in the table """
+        return self.codes.get(string, -1)
+
+    @property
+    def strings(self):
+        """ :return: list of the strings, by index """
+        if self._strings is None:
+            self._strings = list(self.codes)
+        return self._strings
+
+    def __getitem__(self, code):
+        return self.strings[code]
+
+    def __len__(self):
+        return len(self.codes)
+
+
+class Catalog:
+    """
+    Scanned animations stored by columns, one row per animation and one stage row per stage.
+    Strings are stored once in tables, rows only hold their index. Rows keep the scan order : the rows of a module,
+    and the modules of a package, are contiguous, which is what build_package walks through.
+    Queries never loop over rows in Python : each criterion gives a mask of one byte per row, from a range of rows
+    or a bytes.translate of a column, and masks are combined as integers.
+    """
+
+    def __init__(self):
+        self.names = StringTable()
+        self.ids = StringTable()
+        self.files = StringTable()
+        self.objects = StringTable()
+
+        # Packages, in scan order. Modules of package p are packageModules[p] to packageModules[p + 1]
+        self.packageName = array('I')
+        self.packageModules = array('I', [0])
+        # Modules, in scan order. Two lists can give modules with the same name.
+        # Rows of module m are moduleRows[m] to moduleRows[m + 1]
+        self.moduleName = array('I')
+        self.modulePackage = array('I')
+        self.moduleRows = array('I', [0])
+
+        # One row per animation
+        self.module = array('I')
+        self.type = array('B')
+        self.options = [array('B') for i in range(OPTION_PLANES)]
+        # Group key of the animation (Animation.parse_name), precomputed as it drives the tree layout
+        self.group = array('I')
+        # Rows of each group key, in scan order
+        self.groupRows = {}
+        # Stages of row r are stage rows stageStart[r] to stageStart[r + 1]
+        self.stageStart = array('I', [0])
+        # Animation of each row, referenced by the menu entries built from it
+        self.animations = []
+
+        # One row per stage
+        self.stageId = array('I')
+        self.stageFile = array('I')
+        self.stageObj = array('I')
+
+    @classmethod
+    def from_packages(cls, packages):
+        """ :param packages: list of NamedContainer (package) of NamedContainer (module) of Animation """
+        catalog = cls()
+        with Timing.span("aggregation"):
+            for package in packages:
+                catalog.add_package(package)
+        log.info("Catalog : " + str(len(catalog)) + " animations, " + str(len(catalog.stageId)) + " stages, " +
+                 str(len(catalog.ids)) + " distinct ids")
+        return catalog
+
+    def add_package(self, package):
+        package_index = len(self.packageName)
+        self.packageName.append(self.names.add(package.name))
+        for module in package.items:
+            self.moduleName.append(self.names.add(module.name))
+            self.modulePackage.append(package_index)
+            self.add_animations(module.items)
+            self.moduleRows.append(len(self.module))
+        self.packageModules.append(len(self.moduleName))
+
+    def add_animations(self, animations):
+        """ Add rows to the module being added, see add_package """
+        module = len(self.moduleName) - 1
+        row = len(self.module)
+        self.module.extend([module] * len(animations))
+        self.type.extend([_TYPE_CODES[animation.type] for animation in animations])
+        masks = [option_mask(animation.options) for animation in animations]
+        for i, plane in enumerate(self.options):
+            plane.extend([(mask >> (8 * i)) & 0xFF for mask in masks])
+        self.animations.extend(animations)
+
+        groups = self.names.add_all([animation.parse_name() for animation in animations])
+        self.group.extend(groups)
+        group_rows = self.groupRows
+        for group in groups:
+            rows = group_rows.get(group)
+            if rows is None:
+                rows = group_rows[group] = array('I')
+            rows.append(row)
+            row += 1
+
+        first = len(self.stageId)
+        self.stageId.extend(self.ids.add_all(chain.from_iterable(animation.stages for animation in animations)))
+        self.stageFile.extend(self.files.add_all(chain.from_iterable(animation.stages_file for animation in animations)))
+        self.stageObj.extend(self.objects.add_all(chain.from_iterable(animation.stages_obj for animation in animations)))
+        # accumulate starts with first, already in stageStart
+        self.stageStart.extend(islice(accumulate((len(animation.stages) for animation in animations), initial=first), 1, None))
+
+    def __len__(self):
+        return len(self.module)
+
+    def package_count(self):
+        return len(self.packageName)
+
+    def package_rows(self, package):
+        """ :return: range of the rows of a package """
+        modules = self.packageModules
+        return range(self.moduleRows[modules[package]], self.moduleRows[modules[package + 1]])
+
+    def module_rows(self, module):
+        """ :return: range of the rows of a module """
+        return range(self.moduleRows[module], self.moduleRows[module + 1])
+
+    def row_package(self, row):
+        return self.modulePackage[self.module[row]]
+
+    # ----- Queries -----
+
+    def _range_mask(self, ranges):
+        """ :return: mask of the rows in ranges """
+        mask = bytearray(len(self))
+        for rows in ranges:
+            mask[rows.start:rows.stop] = b"\x01" * len(rows)
+        return mask
+
+    def rows(self, package=None, module=None, anim_type=None, options=(), group=None):
+        """
+        Rows matching every given criterion, like all ANIM_OBJ animations with the ACYCLIC option in a package
+        :param package: package name
+        :param module: module name
+        :param options: Animation.OPTION the animations must all have
+        :param group: group key, see Animation.parse_name
+        :return: array of row indexes, in scan order
+        """
+        count = len(self)
+        masks = []
+
+        if package is not None:
+            name = self.names.code(package)
+            masks.append(self._range_mask(self.package_rows(i) for i, code in enumerate(self.packageName)
+                                          if code == name))
+        if module is not None:
+            name = self.names.code(module)
+            masks.append(self._range_mask(self.module_rows(i) for i, code in enumerate(self.moduleName)
+                                          if code == name))
+        if anim_type is not None:
+            code = _TYPE_CODES[anim_type]
+            masks.append(self.type.tobytes().translate(_byte_table(lambda value: value == code)))
+        mask = option_mask(options)
+        for plane in self.options:
+            bits = mask & 0xFF
+            if bits:
+                masks.append(plane.tobytes().translate(_byte_table(lambda value: value & bits == bits)))
+            mask >>= 8
+        if group is not None:
+            group_mask = bytearray(count)
+            for row in self.groupRows.get(self.names.code(group), ()):
+                group_mask[row] = 1
+            masks.append(group_mask)
+
+        if not masks:
+            return array('I', range(count))
+        selected = int.from_bytes(masks[0], "little")
+        for mask in masks[1:]:
+            selected &= int.from_bytes(mask, "little")
+        return array('I', compress(range(count), selected.to_bytes(count, "little")))
+
+    def stage_count(self, rows=None):
+        if rows is None:
+            return len(self.stageId)
+        start = self.stageStart
+        return sum(start[row + 1] - start[row] for row in rows)
+
+    def group_key(self, row):
+        return self.names[self.group[row]]
+
+    def row_options(self, row):
+        """ :return: Animation.OPTION of a row, in OPTION order """
+        mask = 0
+        for i, plane in enumerate(self.options):
+            mask |= plane[row] << (8 * i)
+        return [option for option in OPTIONS if mask & _OPTION_BITS[option]]
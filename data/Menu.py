@@ -0,0 +1,652 @@
+import math
+import logging
+import xml.etree.ElementTree as ET
+
+from collections import Counter
+from itertools import groupby
+
+from data.Catalog import Catalog
+from util import Timing
+from util.Config import get_settings
+from util.MyoReader import iter_myo
+
+log = logging.getLogger(__name__)
+
+
+class MenuNode:
+    """
+    Folder, splitter ("Set N" folder) or animation entry of a menu, without Qt.
+    Grouping, pagination and cleanup follow the same rules as AnimTreeWidget and AnimTreeItem.
+    """
+
+    __slots__ = ("name", "icon", "anim_id", "animation", "stage", "checked", "parent", "children", "is_root",
+                 "bIsSplitter", "splitterCounter", "splitterIndex", "levelTwoCounter", "maxChildCount", "firstOpenRow",
+                 "parentRow", "numberedRows", "checkedCount")
+
+    def __init__(self, name="", icon=None, anim_id="", is_root=False):
+        self.name = name
+        self.icon = get_settings().defaultFolderIcon if icon is None else icon
+        self.anim_id = anim_id
+        # Animation and stage index of an entry built from a scan
+        self.animation = None
+        self.stage = 0
+        self.checked = True
+        self.parent = None
+        self.children = []
+        self.is_root = is_root
+
+        self.bIsSplitter = False
+        self.splitterCounter = 0
+        self.splitterIndex = 0
+        self.levelTwoCounter = 0
+        self.maxChildCount = get_settings().maxItemPerPage
+        # Children before this row are known not to be a splitter with room left, see add_nested_child
+        self.firstOpenRow = 0
+        # Row of the node in its parent, up to date if below the numberedRows of its parent, see row
+        self.parentRow = 0
+        # Children before this row have their parentRow up to date
+        self.numberedRows = 0
+        # Checked animations of a folder, see checked_count. None until counted, then the folders below are counted too
+        self.checkedCount = None
+
+    def is_anim(self):
+        return bool(self.anim_id)
+
+    def child_count(self):
+        return len(self.children)
+
+    def row(self):
+        """ :return: index of the node in its parent. Siblings after the first changed row are numbered again """
+        parent = self.parent
+        if self.parentRow >= parent.numberedRows:
+            siblings = parent.children
+            for i in range(parent.numberedRows, len(siblings)):
+                siblings[i].parentRow = i
+            parent.numberedRows = len(siblings)
+        return self.parentRow
+
+    def iter_subtree(self):
+        """ :return: generator of the node and its descendants, depth first """
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def add_child(self, node):
+        node.parent = self
+        node.parentRow = len(self.children)
+        if self.numberedRows == node.parentRow:
+            self.numberedRows += 1
+        self.children.append(node)
+        if self.checkedCount is not None:
+            self.child_count_changed(node, 1)
+
+    def insert_child(self, index, node):
+        index = min(index, len(self.children))
+        node.parent = self
+        node.parentRow = index
+        self.children.insert(index, node)
+        self.firstOpenRow = min(self.firstOpenRow, index)
+        self.numberedRows = min(self.numberedRows, index)
+        if self.checkedCount is not None:
+            self.child_count_changed(node, 1)
+
+    def take_child(self, index):
+        if index >= len(self.children):
+            return None
+        node = self.children.pop(index)
+        node.parent = None
+        if self.checkedCount is not None:
+            self.child_count_changed(node, -1)
+        self.firstOpenRow = min(self.firstOpenRow, index)
+        self.numberedRows = min(self.numberedRows, index)
+        if self.bIsSplitter and self.parent is not None:
+            # The splitter has room again
+            self.parent.firstOpenRow = min(self.parent.firstOpenRow, self.row())
+        return node
+
+    def remove_child(self, node):
+        if node.parent is self:
+            self.take_child(node.row())
+
+    def add_nested_child(self, item):
+        """ Add a child, paginated in "Set N" splitters, see AnimTreeItem.add_nested_child """
+        children = self.children
+        for i in range(self.firstOpenRow, len(children)):
+            splitter = children[i]
+            if splitter.bIsSplitter:
+                if splitter.child_count() < splitter.maxChildCount:
+                    self.firstOpenRow = i
+                    return splitter.add_child(item)
+        self.firstOpenRow = len(children)
+
+        if 0 < self.splitterIndex < self.maxChildCount:
+            index = self.splitterIndex
+            splitter = self.insert_splitter(index)
+            self.firstOpenRow = min(index, len(children) - 1)
+            return splitter.add_child(item)
+
+        if self.child_count() == self.maxChildCount:
+            index = self.splitterIndex
+            if self.splitter_level() > 1:
+                self.levelTwoCounter += 1
+                index = self.levelTwoCounter
+            splitter = self.insert_splitter(index)
+            for i in range(self.child_count()):
+                child = self.take_child(index + 1)
+                if not child:
+                    # Blank folder, like the tree widget does, removed by cleanup
+                    child = MenuNode()
+
+                if child.bIsSplitter:
+                    child.name = "Set " + str(i + 1)
+
+                splitter.add_child(child)
+
+            splitter = self.insert_splitter()
+            splitter.add_child(item)
+            self.firstOpenRow = 0
+            return
+
+        return self.add_child(item)
+
+    def splitter_level(self):
+        return math.floor(self.splitterCounter / self.maxChildCount)
+
+    def insert_splitter(self, index=-1):
+        if index == -1:
+            index = self.splitterIndex
+        splitter = MenuNode("Set " + str(index + 1), get_settings().defaultSetIcon)
+        splitter.bIsSplitter = True
+        self.insert_child(index, splitter)
+        self.splitterCounter += 1
+        self.splitterIndex = (index + 1) % self.maxChildCount
+        return splitter
+
+    def animations_id(self):
+        if self.bIsSplitter or not self.is_anim():
+            animations = []
+            for child in self.children:
+                animations.extend(child.animations_id())
+            return animations
+        return [self.anim_id]
+
+    def animation_count(self):
+        if self.bIsSplitter or not self.is_anim():
+            return self.checked_count()
+        return 1
+
+    def counted(self):
+        """ :return: number of checked animations the node adds to its parent, None if not counted yet """
+        if not self.checked:
+            return 0
+        if self.bIsSplitter or not self.is_anim():
+            return self.checkedCount
+        return 1
+
+    def checked_count(self):
+        """
+        :return: number of checked animations below the node (folders unchecked hide theirs).
+        Counted once, then kept up to date by the changes of children and check states
+        """
+        if self.checkedCount is None:
+            # Folders not counted yet, parents first
+            nodes = [self]
+            for node in nodes:
+                nodes.extend(child for child in node.children if child.checkedCount is None
+                             and (child.bIsSplitter or not child.is_anim()))
+            for node in reversed(nodes):
+                node.checkedCount = sum(child.counted() for child in node.children)
+        return self.checkedCount
+
+    def child_count_changed(self, child, sign):
+        """ Count a child added (sign 1) or removed (sign -1), in this counted folder and its ancestors """
+        if child.checkedCount is None and (child.bIsSplitter or not child.is_anim()):
+            child.checked_count()
+        self.count_changed(sign * child.counted())
+
+    def count_changed(self, delta):
+        """ Add delta to the count of the node, and of its ancestors as long as they count it """
+        node = self
+        while delta and node is not None and node.checkedCount is not None:
+            node.checkedCount += delta
+            if not node.checked:
+                break
+            node = node.parent
+
+    def to_xml(self, parent, level):
+        if self.bIsSplitter or not self.is_anim():
+            elt = ET.SubElement(parent, "folder" + str(level))
+            elt.set("n", self.name)
+            if self.bIsSplitter:
+                elt.set("i", self.icon or get_settings().defaultSetIcon)
+            else:
+                elt.set("i", self.icon or get_settings().defaultFolderIcon)
+
+            for child in self.children:
+                if child.checked:
+                    child.to_xml(elt, level + 1)
+        else:
+            entry = ET.SubElement(parent, "entry")
+            entry.set("n", self.name)
+            entry.set("i", self.icon or get_settings().defaultAnimationIcon)
+            entry.set("id", self.anim_id)
+
+
+def build_package(catalog, package, animations, register_animation, track_added=True, rows=None):
+    """
+    Folder of a package : a folder per module, then per group of animations, holding an entry per stage.
+    Every level is paginated in "Set N" splitters
+    :param catalog: Catalog holding the package
+    :param package: index of the package in the catalog
+    :param animations: animations id to ignore, added ones are added to it when track_added is set
+    :param register_animation: called with the id of each animation added
+    :param rows: rows of the package to add (see Catalog.rows), in scan order. Every module is added if not given
+    :return: (MenuNode of the package, number of duplicates found and not added)
+    """
+    max_item_string_length = get_settings().maxItemStringLength
+    folder_icon = get_settings().defaultFolderIcon
+    animation_icon = get_settings().defaultAnimationIcon
+    duplicates = 0
+
+    names = catalog.names.strings
+    ids = catalog.ids.strings
+    group_column = catalog.group
+    stage_start = catalog.stageStart
+    stage_id = catalog.stageId
+    if rows is None:
+        modules = ((module, catalog.module_rows(module))
+                   for module in range(catalog.packageModules[package], catalog.packageModules[package + 1]))
+    else:
+        modules = groupby(rows, key=catalog.module.__getitem__)
+
+    package_name = names[catalog.packageName[package]]
+    section = MenuNode(package_name, folder_icon)
+    for module, module_rows in modules:
+        module_name = names[catalog.moduleName[module]]
+        module_section = MenuNode(module_name, folder_icon)
+        section.add_nested_child(module_section)
+
+        previous_group = -1
+        anim_section = None
+        for row in module_rows:
+            group = group_column[row]
+            if group != previous_group:
+                previous_group = group
+                anim_section = MenuNode(names[group][slice(0, max_item_string_length)], folder_icon)
+                module_section.add_nested_child(anim_section)
+
+            animation = catalog.animations[row]
+            first = stage_start[row]
+            for stage_row in range(first, stage_start[row + 1]):
+                stage = ids[stage_id[stage_row]]
+                if stage in animations:
+                    duplicates += 1
+                    log.warning("Duplicate found : %s in %s | %s", stage, package_name, module_name)
+                else:
+                    node = MenuNode(stage[slice(-max_item_string_length, None)], animation_icon, stage)
+                    node.animation = animation
+                    node.stage = stage_row - first
+                    anim_section.add_nested_child(node)
+                    register_animation(stage)
+                    if track_added:
+                        animations.add(stage)
+    return section, duplicates
+
+
+class Menu:
+    """ Menu built from scanned packages or plugins, the Qt-free counterpart of AnimTreeWidget """
+
+    def __init__(self):
+        self.root = MenuNode(is_root=True)
+
+        # Number of nodes in the menu for each animation id
+        self.animationIds = Counter()
+
+        self.pendingRoot = None
+        self.pendingAnimations = set()
+        self.pendingDuplicates = 0
+
+    def clear(self):
+        self.root = MenuNode(is_root=True)
+        self.animationIds.clear()
+
+    def register_animation(self, anim_id):
+        self.animationIds[anim_id] += 1
+
+    def unregister_animations(self, node):
+        """ Forget animations of a node and its descendants, once removed from the menu """
+        for child in node.iter_subtree():
+            if child.anim_id:
+                self.animationIds[child.anim_id] -= 1
+                if self.animationIds[child.anim_id] <= 0:
+                    del self.animationIds[child.anim_id]
+
+    def add_packages(self, packages, animations=None):
+        """
+        Add packages, grouped and paginated like AnimTreeWidget.add_packages
+        :param animations: animations id to ignore, updated with added ones. Defaults to the ones in the menu
+        :return: number of duplicates found (and not added)
+        """
+        self.begin_packages(animations)
+        self.add_pending_packages(packages)
+        return self.end_packages()
+
+    def add_catalog(self, catalog, rows=None, animations=None):
+        """
+        Add rows of a catalog, see add_packages
+        :param rows: rows to add (see Catalog.rows), in scan order. Every package is added if not given
+        :return: number of duplicates found (and not added)
+        """
+        self.begin_packages(animations)
+        self.add_pending_catalog(catalog, rows)
+        return self.end_packages()
+
+    def begin_packages(self, animations=None):
+        """ Start adding packages, they are gathered under a temporary root until end_packages is called """
+        self.pendingAnimations = self.animationIds if animations is None else animations
+        self.pendingDuplicates = 0
+        self.pendingRoot = MenuNode("Scanning...")
+        self.root.add_child(self.pendingRoot)
+
+    def add_pending_packages(self, packages):
+        """ Add packages under the temporary root, see begin_packages """
+        self.add_pending_catalog(Catalog.from_packages(packages))
+
+    def add_pending_catalog(self, catalog, rows=None):
+        """ Add rows of a catalog under the temporary root, see begin_packages and add_catalog """
+        animations = self.pendingAnimations
+        track_added = animations is not self.animationIds
+
+        if rows is None:
+            packages = ((package, None) for package in range(catalog.package_count()))
+        else:
+            packages = groupby(rows, key=catalog.row_package)
+        with Timing.span("build") as timing:
+            count = 0
+            for package, package_rows in packages:
+                section, duplicates = build_package(catalog, package, animations, self.register_animation,
+                                                    track_added, package_rows)
+                self.pendingDuplicates += duplicates
+                self.pendingRoot.add_nested_child(section)
+                timing.add("duplicates", duplicates)
+                count += 1
+            timing.add("packages", count)
+
+    def end_packages(self):
+        """
+        Move added packages from the temporary root to the menu
+        :return: number of duplicates found (and not added)
+        """
+        pending_root = self.pendingRoot
+        with Timing.span("build"):
+            for i in range(pending_root.child_count()):
+                self.root.add_child(pending_root.take_child(0))
+            self.root.remove_child(pending_root)
+
+        self.pendingRoot = None
+        self.pendingAnimations = set()
+        return self.pendingDuplicates
+
+    def add_from_xml(self, xml_file, animations=None, parent=None):
+        """
+        Add folders and entries of a plugin, see AnimTreeWidget.add_items_from_xml
+        :param animations: animations id to ignore, defaults to none. Animations added by this load are never ignored
+        :return: number of animations added
+        """
+        if animations is None:
+            animations = set()
+        folder_icon = get_settings().defaultFolderIcon
+
+        added = set()
+        counter = 0
+        nodes = [parent or self.root]
+        skipped_depth = None
+        with Timing.span("import") as timing:
+            for depth, elt in iter_myo(xml_file):
+                if skipped_depth is not None:
+                    if elt is None and depth == skipped_depth:
+                        skipped_depth = None
+                    continue
+
+                if elt is None:
+                    nodes.pop()
+                    continue
+
+                anim_id = elt.get("id")
+                if anim_id in animations and anim_id not in added:
+                    log.info("Duplicate found : %s", elt.get("n"))
+                    skipped_depth = depth
+                    continue
+
+                node = MenuNode(elt.get("n") or "", elt.get("i") or folder_icon, anim_id or "")
+                if anim_id:
+                    counter += 1
+                    self.register_animation(anim_id)
+                    added.add(anim_id)
+                nodes[-1].add_child(node)
+                nodes.append(node)
+            timing.add("animations", counter)
+        return counter
+
+    def insert_parent(self, items):
+        """
+        Insert a new folder where the first item (whose parent is not selected) is, and move items in it
+        :return: the new folder
+        """
+        new_parent = MenuNode("New Parent")
+
+        parent, item = next((item.parent, item) for item in items if item.parent not in items)
+        parent.insert_child(item.row(), new_parent)
+
+        for item in items:
+            item.parent.remove_child(item)
+            new_parent.add_nested_child(item)
+        return new_parent
+
+    def merge(self, items):
+        """ Move children of every folder into the first one, then remove the emptied folders """
+        parent = items[0]
+        for item in items[1:]:
+            for i in range(item.child_count()):
+                parent.add_nested_child(item.take_child(0))
+            item.parent.remove_child(item)
+
+    def remove(self, items):
+        for item in items:
+            if item.parent is not None:
+                self.remove_from_parent(item)
+                self.unregister_animations(item)
+
+    @staticmethod
+    def set_checked(node, checked):
+        """
+        Check or uncheck a node with its descendants. Ancestors stay checked as long as one of their child is.
+        Checked counts are updated along the way, from the node up to the root
+        """
+        before = node.counted()
+        nodes = list(node.iter_subtree())
+        for child in reversed(nodes):
+            child.checked = checked
+            if child.bIsSplitter or not child.is_anim():
+                child.checkedCount = sum(grandchild.counted() for grandchild in child.children) if checked else 0
+        delta = node.counted() - (before or 0)
+
+        parent = node.parent
+        bStateChanged = True
+        while parent is not None and not parent.is_root and bStateChanged:
+            state = any(child.checked for child in parent.children)
+            bStateChanged = parent.checked != state
+            before = parent.counted()
+            parent.checked = state
+            if parent.checkedCount is None:
+                # Not counted, neither are its ancestors
+                delta = 0
+            else:
+                parent.checkedCount += delta
+                delta = parent.counted() - before
+            parent = parent.parent
+        if parent is not None:
+            parent.count_changed(delta)
+
+    def check_all(self, checked=True):
+        for child in self.root.children:
+            self.set_checked(child, checked)
+
+    def move_up(self, item):
+        """ Move an item to the end of its grandparent, see AnimTreeWidget.action_move_up """
+        n1 = item.parent
+        if n1 is None or n1.is_root:
+            return False
+
+        n1.remove_child(item)
+        n1.parent.add_child(item)
+        return True
+
+    @staticmethod
+    def remove_from_parent(item):
+        if item.parent is not None:
+            item.parent.remove_child(item)
+
+    def cleanup(self, item=None):
+        """
+        Remove empty folders and replace single child folders by their child, iteratively,
+        see AnimTreeWidget.cleanup
+        :return: whether item was removed
+        """
+        if not item:
+            item = self.root
+
+        with Timing.span("cleanup") as timing:
+            emptied = {}
+            removed = 0
+            stack = []
+            result = self.cleanup_leaf(item, emptied)
+            if result is None:
+                stack.append(self.cleanup_steps(item, emptied))
+            while stack:
+                try:
+                    child = stack[-1].send(result)
+                except StopIteration as stop:
+                    stack.pop()
+                    result = stop.value
+                    removed += result[0]
+                    continue
+                result = self.cleanup_leaf(child, emptied)
+                if result is None:
+                    stack.append(self.cleanup_steps(child, emptied))
+                else:
+                    removed += result[0]
+
+            has_been_removed, moved = result
+            if has_been_removed and item.parent is not None:
+                self.replace_children(item.parent, [item.row()], moved)
+            timing.add("removed", removed)
+        return has_been_removed
+
+    @staticmethod
+    def cleanup_leaf(item, emptied):
+        """
+        Cleanup of an animation, or of a folder holding animations only, see AnimTreeWidget.cleanup_leaf
+        :return: same as cleanup_steps, None for a folder holding folders
+        """
+        if item.anim_id:
+            return False, []
+        children = item.children
+        if not children:
+            emptied.pop(id(item), None)
+            return True, []
+        for child in children:
+            if not child.anim_id:
+                return None
+        if len(children) == 1 and not item.is_root:
+            return True, [children[0]]
+        return False, []
+
+    def cleanup_steps(self, item, emptied):
+        """
+        Cleanup of a folder holding folders, see AnimTreeWidget.cleanup_steps
+        :return: whether item is removed, and the nodes to move to the end of its parent
+        """
+        kept = []
+        removed_rows = []
+        moved = []
+        for row, child in enumerate(item.children):
+            if child.anim_id:
+                kept.append(child)
+                continue
+            bRemoved, child_moved = yield child
+            if bRemoved:
+                removed_rows.append(row)
+                moved.extend(child_moved)
+            else:
+                kept.append(child)
+        children = kept + moved
+
+        if len(children) == 1 and not item.is_root:
+            child = children[0]
+            emptied.pop(id(item), None)
+            if id(child) in emptied:
+                bRemoved, child_moved = yield child
+                if bRemoved:
+                    return True, child_moved
+            return True, [child]
+
+        if removed_rows:
+            self.replace_children(item, removed_rows, moved)
+
+        if len(children) == 1 and id(children[0]) in emptied:
+            bRemoved, child_moved = yield children[0]
+            if bRemoved:
+                self.replace_children(item, [0], child_moved)
+                children = child_moved
+
+        if not children or (emptied and any(id(child) in emptied for child in children)):
+            emptied[id(item)] = item
+        else:
+            emptied.pop(id(item), None)
+        return False, []
+
+    @staticmethod
+    def replace_children(parent, rows, moved):
+        """ Remove the children of parent at rows, then add moved nodes at its end, see AnimTreeWidget """
+        for row in reversed(rows):
+            parent.take_child(row)
+        for node in moved:
+            node.parent.remove_child(node)
+            parent.add_child(node)
+
+    def animation_count(self):
+        return self.root.checked_count()
+
+    def to_xml(self, plugin_name):
+        folder0 = ET.Element("folder0")
+        folder0.set("n", plugin_name)
+        folder0.set("i", get_settings().defaultPackageIcon)
+
+        for child in self.root.children:
+            if child.checked:
+                child.to_xml(folder0, 1)
+        return folder0
+
+    def write_xml(self, writer, plugin_name):
+        """ Stream the checked menu to a util.MyoWriter.MyoWriter, same output as to_xml """
+        set_icon = get_settings().defaultSetIcon
+        folder_icon = get_settings().defaultFolderIcon
+        animation_icon = get_settings().defaultAnimationIcon
+
+        writer.open_folder(0, plugin_name, get_settings().defaultPackageIcon)
+        # None closes the folder opened before its children
+        stack = [(child, 1) for child in reversed(self.root.children) if child.checked]
+        while stack:
+            node, level = stack.pop()
+            if node is None:
+                writer.close_folder()
+            elif node.bIsSplitter or not node.is_anim():
+                writer.open_folder(level, node.name, node.icon or (set_icon if node.bIsSplitter else folder_icon))
+                stack.append((None, level))
+                stack.extend((child, level + 1) for child in reversed(node.children) if child.checked)
+            else:
+                writer.entry(node.name, node.icon or animation_icon, node.anim_id)
+        writer.close_folder()
@@ -1,5 +1,7 @@
 class NamedContainer:
 
+    __slots__ = ("name", "items")
+
     def __init__(self, name):
         self.name = name
         self.items = []
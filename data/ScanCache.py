@@ -0,0 +1,111 @@
+import os
+import pickle
+import logging
+
+from util.Config import DEFAULT_CONFIG_FILE
+from data.Animation import Animation, PARSER_VERSION
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CACHE_FILE = os.path.join(os.path.dirname(DEFAULT_CONFIG_FILE), "scan.cache")
+
+# Bump when the layout of the records changes. PARSER_VERSION covers changes of the parsing itself
+CACHE_FORMAT = 1
+
+
+def to_records(animations):
+    """ :return: picklable records of a list of Animation, independent of the package """
+    return [(animation.type.name,
+             tuple(option.name for option in animation.options),
+             tuple(zip(animation.stages, animation.stages_file, animation.stages_obj)))
+            for animation in animations]
+
+
+def from_records(records, package, module):
+    """ :return: list of Animation rebuilt from records """
+    animations = []
+    for anim_type, anim_options, stages in records:
+        animation = Animation(package, module, Animation.TYPE[anim_type],
+                              [Animation.OPTION[option] for option in anim_options], *stages[0])
+        for stage in stages[1:]:
+            animation.add_stage(*stage)
+        animations.append(animation)
+    return animations
+
+
+class ScanCache:
+    """
+    Parsed FNIS lists stored on disk, keyed on path and validated with (mtime, size).
+    The whole cache is dropped when written by another parser version.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_FILE):
+        self.path = path
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.modified = False
+
+    @staticmethod
+    def version():
+        return CACHE_FORMAT, PARSER_VERSION
+
+    @classmethod
+    def load(cls, path=DEFAULT_CACHE_FILE):
+        cache = cls(path)
+        if os.path.exists(path):
+            try:
+                with open(path, 'rb') as file:
+                    version, entries = pickle.load(file)
+                if version == cls.version():
+                    cache.entries = entries
+                else:
+                    log.info("Scan cache written by another version, ignored")
+            except Exception as e:
+                log.warning("Scan cache unreadable, ignored : " + str(e))
+        return cache
+
+    def save(self):
+        if not self.modified:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'wb') as file:
+            pickle.dump((self.version(), self.entries), file, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+        self.modified = False
+
+    def clear(self):
+        self.entries = {}
+        self.modified = False
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    @staticmethod
+    def key(path):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, path, key):
+        """ :return: records of a list if it did not change since it was stored, None otherwise """
+        cached = self.entries.get(path)
+        if cached and cached[0] == key:
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        return None
+
+    def put(self, path, key, records):
+        self.entries[path] = (key, records)
+        self.modified = True
+
+    def prune(self, scan_dir, paths):
+        """ Forget lists under scan_dir which were not found anymore """
+        prefix = os.path.join(scan_dir, "")
+        paths = set(paths)
+        for path in [path for path in self.entries if path.startswith(prefix) and path not in paths]:
+            del self.entries[path]
+            self.modified = True
+
+
+def clear_cache(path=DEFAULT_CACHE_FILE):
+    ScanCache(path).clear()
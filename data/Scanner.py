@@ -0,0 +1,322 @@
+import os
+import logging
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from util.Config import get_config, get_settings
+from util import Timing
+from data.Animation import Animation
+from data.NamedContainer import NamedContainer
+from data.ScanCache import ScanCache, to_records, from_records
+
+log = logging.getLogger(__name__)
+
+
+# Discovery states, following meshes/actors/**/animations/<mod>/FNIS_<mod>_List.txt
+# Actors can be nested, like actors/dlc02/riekling/animations/
+_ROOT, _MESHES, _ACTORS, _ACTOR, _ANIMATIONS, _MOD = range(6)
+
+
+def _next_state(state, name):
+    """ :return: state of a sub directory, or None if FNIS lists cannot be found in it """
+    name = name.lower()
+    if state == _ROOT:
+        return _MESHES if name == "meshes" else _ROOT
+    if state == _MESHES:
+        return _ACTORS if name == "actors" else None
+    if state in (_ACTORS, _ACTOR):
+        return _ANIMATIONS if name == "animations" else _ACTOR
+    if state == _ANIMATIONS:
+        return _MOD
+    return None
+
+
+def _initial_state(scan_dir):
+    """ :return: state of the scanned directory itself, so scanning from meshes/ or animations/ also works """
+    state = _ROOT
+    for name in os.path.normpath(os.path.abspath(scan_dir)).replace("\\", "/").split("/"):
+        if name:
+            state = _next_state(state, name)
+            if state is None:
+                state = _ROOT
+    return state
+
+
+class Discovery:
+    """ FNIS lists found under a directory, with the number of directories visited and pruned """
+
+    def __init__(self):
+        self.entries = []
+        self.visited = 0
+        self.pruned = 0
+
+
+def discover_lists(scan_dir):
+    """
+    Find every FNIS list under a folder, only descending into directories where they can live.
+    Directories are walked top-down in name order, so results do not depend on the file system.
+    Lists are found in package order: lists of the scanned folder itself (packaged by module) are
+    interleaved with its sub directories.
+    :return: Discovery, whose entries are (path, package, module)
+    """
+    max_item_string_length = get_settings().maxItemStringLength
+
+    discovery = Discovery()
+    stack = [(scan_dir, "", _initial_state(scan_dir), False)]
+    while stack:
+        path, package, state, is_list = stack.pop()
+        if is_list:
+            discovery.entries.append((path, package, package))
+            continue
+        discovery.visited += 1
+
+        try:
+            with os.scandir(path) as it:
+                dir_entries = sorted(it, key=lambda x: x.name)
+        except OSError as e:
+            log.warning("Cannot read directory : " + path + " (" + str(e) + ")")
+            continue
+
+        sub_dirs = []
+        children = []
+        for entry in dir_entries:
+            # Symbolic links to directories are not followed, like os.walk does, so links cannot loop
+            if entry.is_dir(follow_symlinks=False):
+                sub_dirs.append(entry)
+            elif entry.name.startswith("FNIS") and entry.name.endswith("List.txt"):
+                module = entry.name[5:-9]
+                if package:
+                    discovery.entries.append((entry.path, package, module))
+                else:
+                    children.append((entry.path, module, state, True))
+
+        # Below the package level, a mod folder only needs its meshes/ folder, skip textures/, sound/, scripts/, ...
+        if state == _ROOT and package:
+            discovery.pruned += sum(1 for entry in sub_dirs if entry.name.lower() != "meshes")
+            sub_dirs = [entry for entry in sub_dirs if entry.name.lower() == "meshes"]
+
+        for entry in sub_dirs:
+            sub_state = _next_state(state, entry.name)
+            if sub_state is None:
+                discovery.pruned += 1
+            else:
+                sub_package = package or entry.name[slice(0, max_item_string_length)]
+                children.append((entry.path, sub_package, sub_state, False))
+
+        if not package:
+            children.sort(key=lambda x: x[1])
+        stack.extend(reversed(children))
+
+    return discovery
+
+
+def read_list(anim_file, package, module):
+    """
+    Parse one FNIS list. Stages are attached to the animation preceding them.
+    :return: list of Animation, in file order
+    """
+    # Per line records are only built at DEBUG level, INFO gets one summary per list
+    debug = log.isEnabledFor(logging.DEBUG)
+    if debug:
+        log.debug("Reading : %s (%s | %s)", anim_file, package, module)
+
+    animations = []
+    stage_count = 0
+    line_count = 0
+    with Timing.span("parsing") as timing, open(anim_file, 'r') as f:
+        anim = None
+        for line in f:
+            line_count += 1
+            anim_type, anim_options, anim_id, anim_path, anim_obj = Animation.parse_line(line)
+
+            if anim_type in (Animation.TYPE.BASIC, Animation.TYPE.ANIM_OBJ, Animation.TYPE.SEQUENCE):
+                anim = Animation(package, module, anim_type, anim_options, anim_id, anim_path, anim_obj)
+                animations.append(anim)
+                if debug:
+                    log.debug("    Adding %s animation || Line : %s", anim_type.name, line.strip())
+
+            elif anim_type == Animation.TYPE.ADDITIVE:
+                if not anim:
+                    log.warning("    Stage without animation, ignored || %s | Line : %s", anim_file, line.strip())
+                    continue
+                anim.add_stage(anim_id, anim_path, anim_obj)
+                stage_count += 1
+                if debug:
+                    log.debug("      Adding stage || Line : %s", line.strip())
+
+            elif debug:
+                log.debug("    animType : %s || Line : %s", anim_type.name, line.strip())
+
+        timing.add("files")
+        timing.add("lines", line_count)
+        timing.add("animations", len(animations))
+        timing.add("stages", stage_count)
+
+    log.info("Read %s (%s | %s) : %d animations, %d stages", anim_file, package, module, len(animations), stage_count)
+    return animations
+
+
+def _read_list(entry):
+    return read_list(*entry)
+
+
+def get_worker_count():
+    """ :return: number of workers configured for parsing, 0 meaning one per CPU """
+    workers = get_config().getint("SCAN", "workers", fallback=0)
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+def iter_lists(entries, workers=None, use_processes=None):
+    """
+    Parse FNIS lists with a pool of workers
+    :param entries: list of (path, package, module), see discover_lists
+    :param workers: number of workers, read from the configuration if not given
+    :param use_processes: use processes instead of threads, read from the configuration if not given
+    :return: generator of animations list, in the same order as entries. Closing it cancels pending lists
+    """
+    if workers is None:
+        workers = get_worker_count()
+    if use_processes is None:
+        use_processes = get_config().getboolean("SCAN", "bUseProcesses", fallback=False)
+
+    if workers <= 1 or len(entries) <= 1:
+        for entry in entries:
+            yield _read_list(entry)
+        return
+
+    executor = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    pool = executor(max_workers=workers)
+    futures = [pool.submit(_read_list, entry) for entry in entries]
+    try:
+        # Results are given in submission order, whichever worker finishes first
+        for future in futures:
+            yield future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+        pool.shutdown(wait=False)
+
+
+def read_lists(entries, workers=None, use_processes=None):
+    """ :return: list of animations list, in the same order as entries. See iter_lists """
+    return list(iter_lists(entries, workers, use_processes))
+
+
+def iter_cached_lists(scan_dir, entries, workers=None):
+    """
+    Same as iter_lists, but lists which did not change since the previous scan are read from the scan cache.
+    The cache is updated once every list has been given.
+    """
+    cache = ScanCache.load()
+    cached = [None] * len(entries)
+    keys = {}
+    to_read = []
+    for i, (anim_file, package, module) in enumerate(entries):
+        try:
+            keys[anim_file] = ScanCache.key(anim_file)
+        except OSError:
+            to_read.append(entries[i])
+            continue
+        cached[i] = cache.get(anim_file, keys[anim_file])
+        if cached[i] is None:
+            to_read.append(entries[i])
+
+    parsed = iter_lists(to_read, workers)
+    try:
+        for (anim_file, package, module), records in zip(entries, cached):
+            if records is not None:
+                yield from_records(records, package, module)
+                continue
+
+            animations = next(parsed)
+            if anim_file in keys:
+                cache.put(anim_file, keys[anim_file], to_records(animations))
+            yield animations
+
+        cache.prune(scan_dir, keys)
+        log.info("Scan cache : " + str(cache.hits) + " lists reused, " + str(len(to_read)) + " lists parsed")
+        Timing.add("parsing", cached=cache.hits)
+    finally:
+        parsed.close()
+        cache.save()
+
+
+def iter_packages(entries, results):
+    """
+    Merge parsed lists into packages, in walk order.
+    Modules of a package are sorted by name when the next package starts.
+    :return: generator of NamedContainer (package) of NamedContainer (module) of Animation,
+             each package being given once complete
+    """
+    previous_package = ""
+    anim_package = None
+    pending = None
+
+    for (anim_file, package, module), animations in zip(entries, results):
+        complete = None
+        with Timing.span("aggregation") as timing:
+            if package != previous_package:
+                if anim_package:
+                    anim_package.items.sort(key=lambda x: x.name, reverse=False)
+                complete, pending = pending, None
+                anim_package = NamedContainer(package)
+            anim_module = NamedContainer(module)
+            anim_module.items = animations
+
+            if anim_module.items:
+                anim_package.add_item(anim_module)
+                timing.add("modules")
+                if package != previous_package:
+                    previous_package = package
+                    pending = anim_package
+                    timing.add("packages")
+        # Given out of the span, so the time spent by the consumer is not counted
+        if complete:
+            yield complete
+
+    if pending:
+        yield pending
+
+
+def group_packages(entries, results):
+    """
+    Merge parsed lists into packages sorted by name, see iter_packages
+    :return: list of NamedContainer (package) of NamedContainer (module) of Animation
+    """
+    packages = list(iter_packages(entries, results))
+    packages.sort(key=lambda x: x.name, reverse=False)
+    return packages
+
+
+def scan_lists(scan_dir, workers=None, use_cache=None):
+    """
+    Discover and parse every FNIS list under a folder
+    :return: (Discovery, generator of animations list in the same order as its entries)
+    """
+    if use_cache is None:
+        use_cache = get_config().getboolean("SCAN", "bUseCache", fallback=True)
+
+    log.info("=============== SCANNING ===============")
+    log.info("Scanning directory : " + scan_dir)
+
+    with Timing.span("discovery") as timing:
+        discovery = discover_lists(scan_dir)
+        timing.add("files", len(discovery.entries))
+        timing.add("directories", discovery.visited)
+    log.info("Found " + str(len(discovery.entries)) + " FNIS lists, " + str(discovery.visited) +
+             " directories visited, " + str(discovery.pruned) + " pruned")
+
+    if use_cache:
+        return discovery, iter_cached_lists(scan_dir, discovery.entries, workers)
+    return discovery, iter_lists(discovery.entries, workers)
+
+
+def scan_folder(scan_dir, workers=None, use_cache=None):
+    """
+    Discover, parse and group every FNIS list under a folder.
+    Lists which did not change since the previous scan are read from the scan cache.
+    :return: list of packages, see group_packages
+    """
+    discovery, results = scan_lists(scan_dir, workers, use_cache)
+    return group_packages(discovery.entries, results)
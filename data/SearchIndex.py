@@ -0,0 +1,130 @@
+from bisect import bisect_right
+from itertools import accumulate
+
+# Texts of an entry are joined with UNIT, entries of a block with RECORD, so a query never matches across them
+UNIT = "\x1f"
+RECORD = "\x1e"
+
+
+class Block:
+    """ Up to SearchIndex.BLOCK_SIZE entries, searched as one string """
+
+    __slots__ = ("keys", "texts", "joined", "starts")
+
+    def __init__(self):
+        self.keys = []
+        self.texts = []
+        self.joined = None
+        # Offset of each entry in joined, followed by the length of joined
+        self.starts = None
+
+    def join(self):
+        if self.joined is None:
+            self.joined = RECORD.join(self.texts)
+            self.starts = list(accumulate((len(text) + 1 for text in self.texts), initial=0))
+        return self.joined
+
+
+class SearchIndex:
+    """
+    Case insensitive substring index of keys (tree items, menu nodes, ...) by their texts.
+    Keys are told apart by identity, so unhashable ones like QTreeWidgetItem can be indexed.
+    Texts are kept lowercased in blocks of joined strings : a query is one str.find per block and per match,
+    without touching the keys, and adding, updating or removing a key only invalidates its block.
+    See benchmark/bench_search.py for keystroke times, compared to a trigram index.
+    """
+
+    BLOCK_SIZE = 1024
+
+    def __init__(self):
+        self.blocks = []
+        # id(key) -> (block, index in block). Blocks hold the keys, so ids are not reused while indexed
+        self.slots = {}
+        # Slots of removed keys, reused by the next ones added
+        self.free = []
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, key):
+        return id(key) in self.slots
+
+    def clear(self):
+        self.blocks = []
+        self.slots = {}
+        self.free = []
+
+    @staticmethod
+    def normalize(texts):
+        """
+        Texts found in another text of the entry (the id in the file name, ...) are left out : a query never spans
+        two texts, so it matches the same entries with less text to search
+        :return: searchable text of an entry
+        """
+        texts = dict.fromkeys(texts)
+        texts.pop("", None)
+        text = UNIT.join(texts)
+        if len(texts) > 1:
+            kept = [other for other in texts if text.count(other) == 1]
+            if len(kept) < len(texts):
+                text = UNIT.join(kept)
+        text = text.lower()
+        return text.replace(RECORD, " ") if RECORD in text else text
+
+    def add(self, key, texts):
+        """ Index key by texts, replacing the texts it was indexed by """
+        text = self.normalize(texts)
+        slot = self.slots.get(id(key))
+        if slot is not None:
+            block, i = slot
+            if block.texts[i] != text:
+                block.texts[i] = text
+                block.joined = None
+            return
+
+        if self.free:
+            block, i = self.free.pop()
+            block.keys[i] = key
+            block.texts[i] = text
+        else:
+            if not self.blocks or len(self.blocks[-1].keys) >= self.BLOCK_SIZE:
+                self.blocks.append(Block())
+            block = self.blocks[-1]
+            i = len(block.keys)
+            block.keys.append(key)
+            block.texts.append(text)
+        block.joined = None
+        self.slots[id(key)] = (block, i)
+
+    def remove(self, key):
+        slot = self.slots.pop(id(key), None)
+        if slot is None:
+            return
+        block, i = slot
+        block.keys[i] = None
+        block.texts[i] = ""
+        block.joined = None
+        self.free.append(slot)
+
+    def search(self, query, limit=None):
+        """
+        :param limit: maximum number of keys returned
+        :return: keys whose texts contain query, in index order
+        """
+        query = query.lower()
+        if not query or UNIT in query or RECORD in query:
+            return []
+
+        found = []
+        for block in self.blocks:
+            joined = block.join()
+            starts = block.starts
+            pos = joined.find(query)
+            while pos != -1:
+                i = bisect_right(starts, pos) - 1
+                found.append(block.keys[i])
+                if limit is not None and len(found) >= limit:
+                    return found
+                # One result per key, even if several of its texts match
+                pos = joined.find(query, starts[i + 1])
+        return found
@@ -0,0 +1,65 @@
+import random
+import unittest
+
+from data.Animation import Animation
+from data.Catalog import Catalog, OPTIONS, TYPES
+from data.NamedContainer import NamedContainer
+
+
+def random_packages(rng):
+    packages = []
+    for p in range(rng.randint(1, 6)):
+        package = NamedContainer("Package" + str(rng.randint(0, 3)))
+        for m in range(rng.randint(0, 4)):
+            module = NamedContainer("Module" + str(rng.randint(0, 3)))
+            for a in range(rng.randint(0, 12)):
+                name = "anim" + str(rng.randint(0, 5))
+                options = rng.sample(OPTIONS, rng.randint(0, 3))
+                animation = Animation(package.name, module.name, rng.choice(TYPES), options,
+                                      name + "_" + str(a) + "_s1", name + "_s1.hkx", "obj" + str(rng.randint(0, 2)))
+                for s in range(rng.randint(0, 3)):
+                    animation.add_stage(name + "_" + str(a) + "_s" + str(s + 2), name + ".hkx", "")
+                module.add_item(animation)
+            package.add_item(module)
+        packages.append(package)
+    return packages
+
+
+class CatalogTest(unittest.TestCase):
+
+    def test_rows(self):
+        rng = random.Random(13)
+        for i in range(200):
+            packages = random_packages(rng)
+            catalog = Catalog.from_packages(packages)
+            flat = [(package.name, module.name, animation)
+                    for package in packages for module in package.items for animation in module.items]
+            self.assertEqual(catalog.animations, [animation for package, module, animation in flat])
+
+            package = rng.choice(["Package0", "Package1", None])
+            module = rng.choice(["Module0", None])
+            anim_type = rng.choice(TYPES + [None])
+            options = rng.sample(OPTIONS, rng.randint(0, 2))
+            group = rng.choice(["anim0", None])
+            expected = [row for row, (package_name, module_name, animation) in enumerate(flat)
+                        if package in (None, package_name) and module in (None, module_name)
+                        and anim_type in (None, animation.type) and set(options).issubset(animation.options)
+                        and group in (None, animation.parse_name())]
+            rows = catalog.rows(package=package, module=module, anim_type=anim_type, options=options, group=group)
+            self.assertEqual(list(rows), expected)
+
+    def test_columns(self):
+        catalog = Catalog.from_packages(random_packages(random.Random(1)))
+        for row, animation in enumerate(catalog.animations):
+            stages = range(catalog.stageStart[row], catalog.stageStart[row + 1])
+            self.assertEqual(tuple(catalog.ids[catalog.stageId[stage]] for stage in stages), animation.stages)
+            self.assertEqual(tuple(catalog.files[catalog.stageFile[stage]] for stage in stages), animation.stages_file)
+            self.assertEqual(tuple(catalog.objects[catalog.stageObj[stage]] for stage in stages), animation.stages_obj)
+            self.assertEqual(set(catalog.row_options(row)), set(animation.options))
+            self.assertEqual(catalog.group_key(row), animation.parse_name())
+            self.assertEqual(catalog.names[catalog.packageName[catalog.row_package(row)]], animation.package)
+            self.assertEqual(catalog.stage_count([row]), len(animation.stages))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+import os
+import random
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication
+
+from data.Menu import Menu, MenuNode
+from widget.AnimTreeItem import AnimTreeItem
+from widget.AnimTreeWidget import AnimTreeWidget
+
+ID = AnimTreeWidget.COLUMN.ID.value
+
+
+# ----- Recursive cleanup of the tree widget, as it was before cleanup_steps (commit 320c1f9) -----
+
+def reference_move_up(tree, item):
+    n1 = item.parent()
+    if not n1:
+        return False
+
+    n2 = n1.parent()
+    if not n2:
+        n2 = tree.invisibleRootItem()
+
+    item_index = n1.indexOfChild(item)
+    item = n1.takeChild(item_index)
+    n2.addChild(item)
+    return True
+
+
+def reference_remove_from_parent(tree, item):
+    parent = item.parent()
+    if not parent:
+        parent = tree.invisibleRootItem()
+    parent.removeChild(item)
+
+
+def reference_cleanup(tree, item=None):
+    has_been_removed = False
+    if not item:
+        item = tree.invisibleRootItem()
+
+    if not item.text(ID):
+        if item.childCount() == 0:
+            reference_remove_from_parent(tree, item)
+            has_been_removed = True
+        else:
+            counter = 0
+            for i in range(item.childCount()):
+                if not reference_cleanup(tree, item.child(counter)):
+                    counter += 1
+
+        if item.childCount() == 1:
+            child = item.child(0)
+            if reference_move_up(tree, child):
+                reference_remove_from_parent(tree, item)
+                has_been_removed = True
+            reference_cleanup(tree, child)
+    return has_been_removed
+
+
+# ----- Random trees -----
+
+def random_tree(rng, depth=0):
+    """
+    Trees have one top level item at least : the recursive cleanup of an empty tree removes the invisible root item
+    from itself, which deletes it
+    :return: list of (name, anim_id, children)
+    """
+    nodes = []
+    for i in range(rng.choice([1, 1, 2, 3, 4] if depth == 0 else [0, 1, 1, 2, 3, 4])):
+        if depth < 5 and rng.random() < 0.7 - depth * 0.1:
+            nodes.append(("Folder" + str(rng.randrange(1000)), "", random_tree(rng, depth + 1)))
+        else:
+            name = "Anim" + str(rng.randrange(1000))
+            nodes.append((name, name.lower(), []))
+    return nodes
+
+
+def fill_items(parent, nodes):
+    for name, anim_id, children in nodes:
+        item = AnimTreeItem()
+        item.setText(AnimTreeWidget.COLUMN.NAME.value, name)
+        item.setText(ID, anim_id)
+        parent.addChild(item)
+        fill_items(item, children)
+
+
+def fill_menu(parent, nodes):
+    for name, anim_id, children in nodes:
+        node = MenuNode(name, anim_id=anim_id)
+        parent.add_child(node)
+        fill_menu(node, children)
+
+
+def dump_items(item):
+    return [(item.child(i).text(AnimTreeWidget.COLUMN.NAME.value), item.child(i).text(ID), dump_items(item.child(i)))
+            for i in range(item.childCount())]
+
+
+def dump_menu(node):
+    return [(child.name, child.anim_id, dump_menu(child)) for child in node.children]
+
+
+def find_folders(item):
+    folders = []
+    stack = [item]
+    while stack:
+        item = stack.pop()
+        for i in range(item.childCount()):
+            child = item.child(i)
+            if not child.text(ID):
+                folders.append(child)
+                stack.append(child)
+    return folders
+
+
+class CleanupTest(unittest.TestCase):
+    """ Iterative cleanups against the recursive one, on random trees """
+
+    TREES = 3000
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.reference = AnimTreeWidget()
+        self.tree = AnimTreeWidget()
+
+    def tearDown(self):
+        self.reference.deleteLater()
+        self.tree.deleteLater()
+
+    def test_random_trees(self):
+        rng = random.Random(22)
+        for i in range(self.TREES):
+            nodes = random_tree(rng)
+            with self.subTest(tree=i):
+                self.reference.clear()
+                self.tree.clear()
+                fill_items(self.reference.invisibleRootItem(), nodes)
+                fill_items(self.tree.invisibleRootItem(), nodes)
+                menu = Menu()
+                fill_menu(menu.root, nodes)
+
+                self.assertEqual(self.tree.cleanup(), reference_cleanup(self.reference))
+                expected = dump_items(self.reference.invisibleRootItem())
+                self.assertEqual(dump_items(self.tree.invisibleRootItem()), expected)
+                menu.cleanup()
+                self.assertEqual(dump_menu(menu.root), expected)
+
+    def test_random_items(self):
+        """ Cleanup of a folder of the tree only """
+        rng = random.Random(23)
+        for i in range(self.TREES // 3):
+            nodes = random_tree(rng)
+            self.reference.clear()
+            self.tree.clear()
+            fill_items(self.reference.invisibleRootItem(), nodes)
+            fill_items(self.tree.invisibleRootItem(), nodes)
+            folders = find_folders(self.reference.invisibleRootItem())
+            if not folders:
+                continue
+            index = rng.randrange(len(folders))
+            with self.subTest(tree=i):
+                expected_removed = reference_cleanup(self.reference, folders[index])
+                self.assertEqual(self.tree.cleanup(find_folders(self.tree.invisibleRootItem())[index]),
+                                 expected_removed)
+                self.assertEqual(dump_items(self.tree.invisibleRootItem()),
+                                 dump_items(self.reference.invisibleRootItem()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import logging
+import tempfile
+import unittest
+
+from util.Logs import setup_logging, stop_logging
+
+
+class SetupLoggingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = logging.getLogger()
+        self.handlers = list(self.root.handlers)
+        self.level = self.root.level
+        self.directory = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.directory.name, "logs.log")
+
+    def tearDown(self):
+        stop_logging()
+        logging.disable(logging.NOTSET)
+        for handler in self.root.handlers:
+            if handler not in self.handlers:
+                self.root.removeHandler(handler)
+                handler.close()
+        self.root.setLevel(self.level)
+        self.directory.cleanup()
+
+    def read_log(self):
+        if not os.path.exists(self.log_file):
+            return ""
+        with open(self.log_file) as f:
+            return f.read()
+
+    def test_child_logger_written(self):
+        setup_logging(self.log_file, logging.INFO, enabled=True, use_queue=True)
+        logging.getLogger("data.Scanner").info("child msg")
+        stop_logging()
+        self.assertIn("data.Scanner : child msg", self.read_log())
+
+    def test_disabled_silences_child_loggers(self):
+        for use_queue in (True, False):
+            with self.subTest(use_queue=use_queue):
+                setup_logging(self.log_file, logging.INFO, enabled=False, use_queue=use_queue)
+                logging.getLogger("data.Scanner").info("child msg")
+                logging.getLogger("widget.AnimTreeWidget").error("child error")
+                stop_logging()
+                self.assertNotIn("child", self.read_log())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import random
+import unittest
+
+from data.Menu import Menu, MenuNode
+
+
+class MenuNodeRowTest(unittest.TestCase):
+
+    def check_rows(self, root):
+        for node in root.iter_subtree():
+            for row, child in enumerate(node.children):
+                self.assertIs(child.parent, node)
+                self.assertEqual(child.row(), row)
+
+    def test_random_edits(self):
+        rng = random.Random(8)
+        menu = Menu()
+        nodes = []
+        for i in range(2000):
+            parents = [menu.root] + [node for node in nodes if node.parent is not None and not node.anim_id]
+            parent = rng.choice(parents)
+            edit = rng.randrange(6)
+            if edit == 0:
+                node = MenuNode("Folder" + str(i))
+                parent.add_nested_child(node)
+                nodes.append(node)
+            elif edit == 1:
+                node = MenuNode("Anim" + str(i), anim_id="anim" + str(i))
+                parent.insert_child(rng.randint(0, parent.child_count()), node)
+                nodes.append(node)
+            elif edit == 2 and parent.children:
+                parent.take_child(rng.randrange(parent.child_count()))
+            elif edit == 3 and parent.children:
+                child = rng.choice(parent.children)
+                if not parent.is_root:
+                    menu.move_up(child)
+            elif edit == 4:
+                items = [node for node in parents if not node.is_root]
+                if items:
+                    menu.insert_parent(rng.sample(items, 1))
+            elif edit == 5 and rng.random() < 0.1:
+                menu.cleanup()
+            if i % 50 == 0:
+                self.check_rows(menu.root)
+        self.check_rows(menu.root)
+
+
+def recursive_count(node):
+    """ Checked animations below a node, counted like before checked counts were kept """
+    if node.bIsSplitter or not node.is_anim():
+        return sum(recursive_count(child) for child in node.children if child.checked)
+    return 1
+
+
+def ancestors(node):
+    while node is not None:
+        yield node
+        node = node.parent
+
+
+class MenuNodeCheckedCountTest(unittest.TestCase):
+
+    def test_random_checks(self):
+        rng = random.Random(9)
+        for seed in range(20):
+            menu = Menu()
+            nodes = []
+            for i in range(400):
+                parents = [menu.root] + [node for node in nodes if node.parent is not None and not node.anim_id]
+                parent = rng.choice(parents)
+                edit = rng.randrange(7)
+                if edit == 0:
+                    node = MenuNode("Folder" + str(i))
+                    parent.add_nested_child(node)
+                    nodes.append(node)
+                elif edit == 1:
+                    node = MenuNode("Anim" + str(i), anim_id="anim" + str(i))
+                    parent.insert_child(rng.randint(0, parent.child_count()), node)
+                    nodes.append(node)
+                elif edit == 2 and parent.children:
+                    parent.take_child(rng.randrange(parent.child_count()))
+                elif edit == 3 and parent.children and not parent.is_root:
+                    menu.move_up(rng.choice(parent.children))
+                elif edit == 4:
+                    items = [node for node in nodes if node.parent is not None and not node.anim_id]
+                    if len(items) > 1:
+                        items = rng.sample(items, 2)
+                        if not any(items[1] is ancestor for ancestor in ancestors(items[0])):
+                            menu.merge(items)
+                elif edit == 5:
+                    items = [node for node in nodes if node.parent is not None]
+                    if items:
+                        Menu.set_checked(rng.choice(items), rng.random() < 0.5)
+                elif edit == 6 and rng.random() < 0.1:
+                    menu.cleanup()
+                if rng.random() < 0.2:
+                    self.assertEqual(menu.animation_count(), recursive_count(menu.root))
+                    node = rng.choice(parents)
+                    if node.parent is not None or node.is_root:
+                        self.assertEqual(node.animation_count(), recursive_count(node))
+            self.assertEqual(menu.animation_count(), recursive_count(menu.root))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from util import MyoWriter
+
+
+class Tree:
+    """ Stand-in for a menu, see Menu.write_xml """
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.exports = 0
+
+    def write_xml(self, writer, plugin_name):
+        self.exports += 1
+        writer.open_folder(0, plugin_name, "icon")
+        for name in self.entries:
+            writer.entry(name, "icon", name.lower())
+        writer.close_folder()
+
+
+class WriteMyoTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "Plugin.myo")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def read(self):
+        with open(self.path) as f:
+            return f.read()
+
+    def test_unchanged_not_opened(self):
+        tree = Tree(["Anim1", "Anim2"])
+        self.assertTrue(MyoWriter.write_myo(self.path, tree, "Plugin"))
+        self.assertEqual(tree.exports, 1)
+        written = self.read()
+        self.assertEqual(written, '<folder0 n="Plugin" i="icon"><entry n="Anim1" i="icon" id="anim1" />'
+                                  '<entry n="Anim2" i="icon" id="anim2" /></folder0>')
+
+        # Neither the plugin nor a temporary file is opened
+        with mock.patch("builtins.open", wraps=open) as opened:
+            self.assertFalse(MyoWriter.write_myo(self.path, tree, "Plugin"))
+        self.assertEqual(opened.call_count, 0)
+        self.assertEqual(tree.exports, 2)
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+
+    def test_changed_written(self):
+        MyoWriter.write_myo(self.path, Tree(["Anim1"]), "Plugin")
+        self.assertTrue(MyoWriter.write_myo(self.path, Tree(["Anim1", "Anim2"]), "Plugin"))
+        self.assertIn("Anim2", self.read())
+
+    def test_edited_by_hand(self):
+        tree = Tree(["Anim1"])
+        MyoWriter.write_myo(self.path, tree, "Plugin")
+        expected = self.read()
+        with open(self.path, "w") as f:
+            f.write(expected.replace("Anim1", "Edited"))
+        self.assertTrue(MyoWriter.write_myo(self.path, tree, "Plugin"))
+        self.assertEqual(self.read(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+
+from data.Scanner import discover_lists
+
+
+class DiscoverListsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.data = os.path.join(self.directory.name, "data")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def add_list(self, *path):
+        folder = os.path.join(self.data, *path)
+        os.makedirs(folder, exist_ok=True)
+        list_file = os.path.join(folder, "FNIS_" + path[-1] + "_List.txt")
+        with open(list_file, "w") as f:
+            f.write("b Anim_" + path[-1] + " Anim_" + path[-1] + ".hkx\n")
+        return list_file
+
+    def test_nested_actors(self):
+        character = self.add_list("meshes", "actors", "character", "animations", "ModA")
+        riekling = self.add_list("meshes", "actors", "dlc02", "riekling", "animations", "ModB")
+        os.makedirs(os.path.join(self.data, "meshes", "actors", "dlc02", "riekling", "character assets"))
+        os.makedirs(os.path.join(self.data, "textures", "actors"))
+
+        discovery = discover_lists(self.data)
+        self.assertEqual(sorted(path for path, package, module in discovery.entries), sorted([character, riekling]))
+        self.assertEqual(sorted(module for path, package, module in discovery.entries), ["ModA", "ModB"])
+
+    def test_mod_folders(self):
+        mods = self.data
+        a = self.add_list("ModA", "meshes", "actors", "character", "animations", "ModA")
+        b = self.add_list("ModB", "meshes", "actors", "dlc01", "vampirelord", "animations", "ModB")
+        os.makedirs(os.path.join(mods, "ModA", "textures", "meshes"))
+
+        discovery = discover_lists(mods)
+        self.assertEqual([(path, package) for path, package, module in discovery.entries], [(a, "ModA"), (b, "ModB")])
+        self.assertGreater(discovery.pruned, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
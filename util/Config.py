@@ -1,6 +1,8 @@
 import configparser
 import os
 
+from dataclasses import dataclass
+
 DEFAULT_CONFIG_FILE = "conf.ini"
 
 
@@ -15,6 +17,7 @@ def create_config():
     config.set("CONFIG", "bFirstTime", "True")
     config.set("CONFIG", "bUseModOrganizer", "True")
     config.set("CONFIG", "lastName", "")
+    config.set("CONFIG", "bUseModelView", "False")
 
     config.add_section("PLUGIN")
     config.set("PLUGIN", "name", "OSelector")
@@ -30,9 +33,16 @@ def create_config():
     config.set("PATHS", "pluginFolder", "meshes/0SA/_MyOSA/anim_1/")
     config.set("PATHS", "pluginInstall", "meshes/0SA/mod/__install/plugin/")
 
+    config.add_section("SCAN")
+    config.set("SCAN", "workers", "0")
+    config.set("SCAN", "bUseProcesses", "False")
+    config.set("SCAN", "bUseCache", "True")
+
     config.add_section("LOG")
     config.set("LOG", "enabled", "True")
     config.set("LOG", "level", "INFO")
+    config.set("LOG", "bUseQueue", "True")
+    config.set("LOG", "bTimings", "True")
 
     with open(DEFAULT_CONFIG_FILE, 'w') as config_file:
         config.write(config_file)
@@ -53,7 +63,33 @@ def load_config():
     return config
 
 
+@dataclass(frozen=True)
+class Settings:
+    """
+    PLUGIN values of the configuration, parsed once. Read on hot paths (one access per item) instead of
+    the config object, whose get parses the value on each call
+    """
+    name: str
+    defaultPackageIcon: str
+    defaultFolderIcon: str
+    defaultSetIcon: str
+    defaultAnimationIcon: str
+    maxItemPerPage: int
+    maxItemStringLength: int
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(name=config.get("PLUGIN", "name"),
+                   defaultPackageIcon=config.get("PLUGIN", "defaultPackageIcon"),
+                   defaultFolderIcon=config.get("PLUGIN", "defaultFolderIcon"),
+                   defaultSetIcon=config.get("PLUGIN", "defaultSetIcon"),
+                   defaultAnimationIcon=config.get("PLUGIN", "defaultAnimationIcon"),
+                   maxItemPerPage=config.getint("PLUGIN", "maxItemPerPage", fallback=25),
+                   maxItemStringLength=config.getint("PLUGIN", "maxItemStringLength"))
+
+
 CONFIG = load_config()
+SETTINGS = Settings.from_config(CONFIG)
 
 
 def get_config():
@@ -63,7 +99,36 @@ def get_config():
     return CONFIG
 
 
+def get_settings():
+    """
+    :return: Settings of the configuration, as of the last load or save
+    """
+    return SETTINGS
+
+
+def refresh_settings():
+    """
+    Parse settings again, once the config object changed
+    :return: new Settings
+    """
+    global SETTINGS
+    SETTINGS = Settings.from_config(get_config())
+    return SETTINGS
+
+
+def reload_config():
+    """
+    Read the config file again, after it was changed outside of the tool
+    :return: config object
+    """
+    global CONFIG
+    CONFIG = load_config()
+    refresh_settings()
+    return CONFIG
+
+
 def save_config():
     """ Save configuration in a file """
     with open(DEFAULT_CONFIG_FILE, 'w') as config_file:
         get_config().write(config_file)
+    refresh_settings()
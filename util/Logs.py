@@ -0,0 +1,107 @@
+import time
+import queue
+import logging
+import threading
+import logging.handlers
+
+LOG_FORMAT = '%(asctime)s - [%(levelname)s] - %(name)s : %(message)s'
+LOG_DATE_FORMAT = '%m/%d/%Y %I:%M:%S %p'
+
+
+class LogStats:
+    """ Volume of logs written, and time spent formatting and writing them """
+
+    def __init__(self, records=0, size=0, seconds=0.0):
+        self.records = records
+        self.size = size
+        self.seconds = seconds
+
+    def __sub__(self, other):
+        return LogStats(self.records - other.records, self.size - other.size, self.seconds - other.seconds)
+
+    def __str__(self):
+        return (str(self.records) + " log records, " + str(round(self.size / 1024)) + " KB, " +
+                str(round(self.seconds, 2)) + "s formatting and writing")
+
+
+class MeasuredFileHandler(logging.FileHandler):
+    """ File handler keeping LogStats of what it wrote """
+
+    def __init__(self, filename, mode="a"):
+        super().__init__(filename, mode)
+        self.stats = LogStats()
+        self.statsLock = threading.Lock()
+        self.lastSize = 0
+
+    def format(self, record):
+        text = super().format(record)
+        self.lastSize = len(text) + 1
+        return text
+
+    def emit(self, record):
+        # Called by handle() with the handler lock held, so lastSize belongs to this record
+        start = time.perf_counter()
+        self.lastSize = 0
+        super().emit(record)
+        elapsed = time.perf_counter() - start
+        with self.statsLock:
+            self.stats.records += 1
+            self.stats.size += self.lastSize
+            self.stats.seconds += elapsed
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler leaving records untouched : formatting (and %-style arguments merging) is done by the
+    listener thread instead of the thread logging
+    """
+
+    def prepare(self, record):
+        return record
+
+
+_listener = None
+_file_handler = None
+
+
+def setup_logging(filename, level, enabled=True, use_queue=True):
+    """
+    Log to a file, through a queue emptied by a background thread when use_queue is set,
+    so the threads logging never wait for the file.
+    When logging is not enabled, no handler is installed and records of every logger are dropped
+    """
+    global _listener, _file_handler
+
+    if not enabled:
+        logging.disable(logging.CRITICAL)
+        return
+
+    _file_handler = MeasuredFileHandler(filename, mode="w")
+    _file_handler.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    if use_queue:
+        log_queue = queue.SimpleQueue()
+        root.addHandler(DeferredQueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(log_queue, _file_handler)
+        _listener.start()
+    else:
+        root.addHandler(_file_handler)
+
+
+def stop_logging():
+    """ Write pending records, to call before exiting """
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+
+def log_stats():
+    """ :return: LogStats of the log file since setup_logging, records still in the queue are not counted """
+    if _file_handler is None:
+        return LogStats()
+    with _file_handler.statsLock:
+        stats = _file_handler.stats
+        return LogStats(stats.records, stats.size, stats.seconds)
@@ -0,0 +1,25 @@
+import xml.etree.ElementTree as ET
+
+import logging
+log = logging.getLogger(__name__)
+
+
+def iter_myo(xml_file):
+    """
+    Read a plugin element by element, finished elements are dropped so memory does not grow with the file.
+    The root element (folder0) is not reported, its descendants are, depth first
+    :return: generator of (depth, element) when an element starts, and of (depth, None) when it ends.
+    Only the attributes of the element can be used
+    """
+    elements = []
+    for event, elt in ET.iterparse(xml_file, events=("start", "end")):
+        if event == "start":
+            elements.append(elt)
+            if len(elements) > 1:
+                yield len(elements) - 1, elt
+        else:
+            elements.pop()
+            if elements:
+                yield len(elements), None
+                # A finished element is always the last child of its parent
+                del elements[-1][-1]
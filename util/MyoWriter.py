@@ -0,0 +1,196 @@
+import os
+import stat
+import hashlib
+import locale
+from contextlib import contextmanager
+from util import Timing
+
+import logging
+log = logging.getLogger(__name__)
+
+# Same replacements as xml.etree.ElementTree for attribute values, so the output does not change
+_ATTRIBUTE_ESCAPES = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    "\"": "&quot;",
+    "\r": "&#13;",
+    "\n": "&#10;",
+    "\t": "&#09;",
+})
+
+BUFFER_SIZE = 1 << 16
+
+
+def escape_attribute(text):
+    return text.translate(_ATTRIBUTE_ESCAPES)
+
+
+# Digest of the files read or written, by path, with the (mtime_ns, size) they had then
+_digests = {}
+
+
+def file_key(path):
+    """ :return: (mtime_ns, size) of path, None if there is no such file """
+    try:
+        status = os.stat(path)
+    except OSError:
+        return None
+    if not stat.S_ISREG(status.st_mode):
+        return None
+    return status.st_mtime_ns, status.st_size
+
+
+def file_digest(path):
+    """
+    A file is only read again once its date or size changed, so a plugin edited by hand is still hashed again
+    :return: hex digest of the content of path, None if there is no such file
+    """
+    key = file_key(path)
+    if key is None:
+        return None
+    cached = _digests.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(BUFFER_SIZE), b""):
+            digest.update(chunk)
+    _digests[path] = (key, digest.hexdigest())
+    return digest.hexdigest()
+
+
+class MemoryFile:
+    """ Text file keeping what is written to it in memory, encoded like a file opened by open(path, "w") """
+
+    def __init__(self):
+        self.encoding = locale.getpreferredencoding(False)
+        self.errors = "strict"
+        self.chunks = []
+
+    def write(self, text):
+        self.chunks.append(text)
+
+
+class HashingFile:
+    """
+    Text file hashing what is written to it, as the bytes it stores.
+    Writes are gathered and passed on by chunks of about BUFFER_SIZE characters
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.digest = hashlib.sha256()
+        self.chunks = []
+        self.size = 0
+        # Set once the file is closed : False if the file on disk already had this content
+        self.bWritten = False
+
+    def write(self, text):
+        self.chunks.append(text)
+        self.size += len(text)
+        if self.size >= BUFFER_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.chunks:
+            text = "".join(self.chunks)
+            self.file.write(text)
+            self.digest.update(text.encode(self.file.encoding, self.file.errors))
+            self.chunks = []
+            self.size = 0
+
+    def hexdigest(self):
+        self.flush()
+        return self.digest.hexdigest()
+
+
+@contextmanager
+def atomic_open(path):
+    """
+    Gather what the block writes in memory, then write it to a temporary file next to path, renamed to path.
+    An interrupted write leaves the previous file untouched, and so does writing the same content again : the
+    temporary file is only opened when the digest differs from the one of path
+    :return: HashingFile opened for writing
+    """
+    tmp_path = path + ".tmp"
+    memory_file = MemoryFile()
+    hashing_file = HashingFile(memory_file)
+    try:
+        yield hashing_file
+        digest = hashing_file.hexdigest()
+        if digest == file_digest(path):
+            log.info(path + " unchanged, not written")
+            return
+        with open(tmp_path, "w", buffering=BUFFER_SIZE) as file:
+            for chunk in memory_file.chunks:
+                file.write(chunk)
+        os.replace(tmp_path, path)
+        hashing_file.bWritten = True
+        key = file_key(path)
+        if key is not None:
+            _digests[path] = (key, digest)
+    except BaseException:
+        log.error("Writing " + path + " failed, previous file kept")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class MyoWriter:
+    """
+    Write a plugin menu element by element, without building it in memory.
+    Output is the same as ET.tostring(root, "unicode") of the equivalent ElementTree
+    """
+
+    def __init__(self, file):
+        self.file = file
+        # Tag of each open folder, and whether its start tag is still waiting for its ">"
+        self.folders = []
+        self.bStartTagOpen = False
+        self.folderCount = 0
+        self.entryCount = 0
+
+    def close_start_tag(self):
+        if self.bStartTagOpen:
+            self.file.write(">")
+            self.bStartTagOpen = False
+
+    def open_folder(self, level, name, icon):
+        self.close_start_tag()
+        tag = "folder" + str(level)
+        self.file.write("<" + tag + " n=\"" + escape_attribute(name) + "\" i=\"" + escape_attribute(icon) + "\"")
+        self.folders.append(tag)
+        self.bStartTagOpen = True
+        self.folderCount += 1
+
+    def close_folder(self):
+        tag = self.folders.pop()
+        if self.bStartTagOpen:
+            self.file.write(" />")
+            self.bStartTagOpen = False
+        else:
+            self.file.write("</" + tag + ">")
+
+    def entry(self, name, icon, anim_id):
+        self.close_start_tag()
+        self.file.write("<entry n=\"" + escape_attribute(name) +
+                        "\" i=\"" + escape_attribute(icon) +
+                        "\" id=\"" + escape_attribute(anim_id) + "\" />")
+        self.entryCount += 1
+
+
+def write_myo(path, tree, plugin_name):
+    """
+    Export a menu to a .myo file, left untouched if it already holds this menu
+    :param tree: AnimTreeWidget, AnimTreeView or data.Menu.Menu, anything with write_xml(writer, plugin_name)
+    :return: whether the file was written
+    """
+    with Timing.span("export") as timing:
+        with atomic_open(path) as file:
+            writer = MyoWriter(file)
+            tree.write_xml(writer, plugin_name)
+        timing.add("folders", writer.folderCount)
+        timing.add("entries", writer.entryCount)
+        timing.add("written", int(file.bWritten))
+    return file.bWritten
@@ -0,0 +1,149 @@
+import json
+import time
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+# Order of the stages in reports, other spans follow in the order they were first recorded
+STAGES = ("discovery", "parsing", "aggregation", "build", "cleanup", "count", "export", "import")
+
+
+class SpanTotal:
+    """ Accumulated wall and CPU time of every span of a name, with their counts """
+
+    __slots__ = ("name", "calls", "wall", "cpu", "counts")
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.counts = {}
+
+    def to_dict(self):
+        return dict(calls=self.calls, wall=round(self.wall, 6), cpu=round(self.cpu, 6), **self.counts)
+
+    def __str__(self):
+        counts = ", ".join(str(value) + " " + key for key, value in self.counts.items())
+        return (self.name + " : " + str(round(self.wall, 3)) + "s (cpu " + str(round(self.cpu, 3)) + "s)" +
+                (" - " + counts if counts else ""))
+
+
+class Span:
+    """
+    Time a block, in wall time and CPU time of the calling thread. Counts added with add() are summed
+    with the ones of the other spans of the same name
+    """
+
+    __slots__ = ("name", "counts", "wall", "cpu")
+
+    def __init__(self, name):
+        self.name = name
+        self.counts = {}
+
+    def add(self, key, value=1):
+        self.counts[key] = self.counts.get(key, 0) + value
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        return self
+
+    def __exit__(self, *args):
+        wall = time.perf_counter() - self.wall
+        cpu = time.thread_time() - self.cpu
+        with _lock:
+            total = _total(self.name)
+            total.calls += 1
+            total.wall += wall
+            total.cpu += cpu
+            for key, value in self.counts.items():
+                total.counts[key] = total.counts.get(key, 0) + value
+
+
+class NullSpan:
+    """ Span doing nothing, given when timing is disabled """
+
+    __slots__ = ()
+
+    def add(self, key, value=1):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+_NULL_SPAN = NullSpan()
+_lock = threading.Lock()
+_totals = {}
+_enabled = True
+
+
+def _total(name):
+    """ :return: SpanTotal of a name, created if needed. Lock must be held """
+    total = _totals.get(name)
+    if total is None:
+        total = _totals[name] = SpanTotal(name)
+    return total
+
+
+def set_enabled(enabled):
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled():
+    return _enabled
+
+
+def span(name):
+    """
+    :return: context manager timing a block under name, a shared no-op one when timing is disabled.
+    Spans run in process pool workers are not reported
+    """
+    if _enabled:
+        return Span(name)
+    return _NULL_SPAN
+
+
+def add(name, **counts):
+    """ Add counts to the spans of a name, without timing anything. Does nothing when timing is disabled """
+    if not _enabled:
+        return
+    with _lock:
+        total = _total(name)
+        for key, value in counts.items():
+            total.counts[key] = total.counts.get(key, 0) + value
+
+
+def reset():
+    """ Forget spans recorded so far """
+    with _lock:
+        _totals.clear()
+
+
+def totals():
+    """ :return: list of SpanTotal recorded since the last reset, stages first """
+    with _lock:
+        spans = list(_totals.values())
+    order = {name: i for i, name in enumerate(STAGES)}
+    return sorted(spans, key=lambda total: order.get(total.name, len(order)))
+
+
+def summary():
+    """ :return: one line per span, or "" if nothing was recorded """
+    return "\n".join(str(total) for total in totals())
+
+
+def write_report(path):
+    """ Write recorded spans as JSON, name -> {calls, wall, cpu, counts...} """
+    report = {total.name: total.to_dict() for total in totals()}
+    try:
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+    except OSError as e:
+        log.error("Cannot write timing report : " + path + " (" + str(e) + ")")
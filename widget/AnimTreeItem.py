@@ -2,12 +2,12 @@ import math
 import widget.AnimTreeWidget
 import xml.etree.ElementTree as ET
 
-from util.Config import get_config
+from util import Timing
+from util.Config import get_settings
 
 import logging
 log = logging.getLogger(__name__)
 
-from util.Config import get_config
 from PyQt5.QtGui import QBrush
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import QTreeWidgetItem
@@ -18,14 +18,22 @@ class AnimTreeItem(QTreeWidgetItem):
     def __init__(self, *__args):
         super().__init__(*__args)
         self.setFlags(self.flags())
-        self.setText(widget.AnimTreeWidget.AnimTreeWidget.COLUMN.ICON.value, get_config().get("PLUGIN", "defaultFolderIcon"))
+        self.setText(widget.AnimTreeWidget.AnimTreeWidget.COLUMN.ICON.value, get_settings().defaultFolderIcon)
         self.setTextAlignment(widget.AnimTreeWidget.AnimTreeWidget.COLUMN.ICON.value, Qt.AlignCenter)
         self.setCheckState(0, Qt.Checked)
         self.splitterCounter = 0
         self.splitterIndex = 0
         self.levelTwoCounter = 0
-        self.maxChildCount = get_config().getint("PLUGIN", "maxItemStringLength")
+        self.maxChildCount = get_settings().maxItemPerPage
         self.bIsSplitter = False
+        # Children before this row are known not to be a splitter with room left, see add_nested_child.
+        # Lowered by AnimTreeWidget when rows change, code changing a detached item children must reset it
+        self.firstOpenRow = 0
+        # Checked animations in the subtree, maintained by AnimTreeWidget while attached (None when unknown).
+        # Code changing a detached subtree must reset it on the nodes it changes
+        self.checkedCount = None
+        # Last check state seen by AnimTreeWidget, for animations
+        self.bChecked = None
 
     @classmethod
     def convert_to_anim_tree_item(cls, obj):
@@ -39,11 +47,81 @@ class AnimTreeItem(QTreeWidgetItem):
         obj.splitterCounter = 0
         obj.splitterIndex = 0
         obj.levelTwoCounter = 0
-        obj.maxChildCount = get_config().get("PLUGIN", "maxItemStringLength")
+        obj.maxChildCount = get_settings().maxItemPerPage
+        obj.firstOpenRow = 0
+        obj.checkedCount = None
+        obj.bChecked = None
 
-    def add_nested_child(self, item):
-        # If there are already splitter let's try to add the item to the first available
-        for i in range(self.childCount()):
+    @classmethod
+    def from_menu_node(cls, node, search_index=None):
+        """
+        Create the items of a data.Menu.MenuNode and its descendants, detached from any tree,
+        each parent receiving all its children at once
+        :param search_index: data.SearchIndex.SearchIndex the created items are added to
+        :return: AnimTreeItem of node
+        """
+        columns = tuple(column.value for column in widget.AnimTreeWidget.AnimTreeWidget.COLUMN)
+        root = cls.item_from_menu_node(node, columns)
+        created = [(node, root)]
+        stack = [(node, root)]
+        while stack:
+            node, item = stack.pop()
+            if node.children:
+                children = [cls.item_from_menu_node(child, columns) for child in node.children]
+                item.addChildren(children)
+                stack.extend(zip(node.children, children))
+                created.extend(zip(node.children, children))
+
+        # Every item is checked, so counts are known : AnimTreeWidget will not walk the subtree once attached
+        counts = {}
+        for node, item in reversed(created):
+            if node.anim_id:
+                item.bChecked = True
+                counts[node] = 1
+            else:
+                item.checkedCount = counts[node] = sum(counts[child] for child in node.children)
+
+        if search_index is not None:
+            search_texts = widget.AnimTreeWidget.AnimTreeWidget.search_texts
+            for node, item in created:
+                search_index.add(item, search_texts(item))
+
+        if Timing.is_enabled():
+            Timing.add("build", items=len(created), animations=counts[created[0][0]],
+                       splitters=sum(1 for node, item in created if node.bIsSplitter))
+        return root
+
+    @classmethod
+    def item_from_menu_node(cls, node, columns):
+        """
+        :param columns: values of AnimTreeWidget.COLUMN, in declaration order
+        :return: AnimTreeItem of a data.Menu.MenuNode, its name and icon being already computed
+        """
+        name_column, icon_column, type_column, options_column, id_column, file_column, anim_obj_column = columns
+        item = cls()
+        item.setText(name_column, node.name)
+        item.setText(icon_column, node.icon)
+        animation = node.animation
+        if animation is not None:
+            # Same columns as set_animation
+            item.setFlags(item.flags() ^ Qt.ItemIsDropEnabled)
+            item.setText(type_column, animation.type.name)
+            item.setText(options_column, str([x.name for x in animation.options]))
+            item.setText(id_column, str(animation.stages[node.stage]))
+            item.setText(file_column, str(animation.stages_file[node.stage]))
+            item.setText(anim_obj_column, str(animation.stages_obj[node.stage]))
+        item.bIsSplitter = node.bIsSplitter
+        item.splitterCounter = node.splitterCounter
+        item.splitterIndex = node.splitterIndex
+        item.levelTwoCounter = node.levelTwoCounter
+        return item
+
+    def open_splitter(self):
+        """
+        Rows already known to be full are skipped, so adding many children stays linear
+        :return: first splitter child with room left, None if there is none
+        """
+        for i in range(self.firstOpenRow, self.childCount()):
             splitter = self.child(i)
             try:
                 test = splitter.bIsSplitter
@@ -51,12 +129,22 @@ class AnimTreeItem(QTreeWidgetItem):
                 AnimTreeItem.convert_to_anim_tree_item(splitter)
             if splitter.bIsSplitter:
                 if splitter.childCount() < splitter.maxChildCount:
-                    return splitter.addChild(item)
+                    self.firstOpenRow = i
+                    return splitter
+        self.firstOpenRow = self.childCount()
+        return None
+
+    def add_nested_child(self, item):
+        # If there are already splitter let's try to add the item to the first available.
+        splitter = self.open_splitter()
+        if splitter is not None:
+            return splitter.addChild(item)
 
         # If none is available, add an other splitter, if needed
         if 0 < self.next_splitter_index() < self.maxChildCount:
             index = self.next_splitter_index()
             splitter = self.insert_splitter(index)
+            self.firstOpenRow = min(index, self.childCount())
 
             return splitter.addChild(item)
 
@@ -83,10 +171,36 @@ class AnimTreeItem(QTreeWidgetItem):
 
             splitter = self.insert_splitter()
             splitter.addChild(item)
+            self.firstOpenRow = 0
             return True
 
         return self.addChild(item)
 
+    def add_nested_children(self, items):
+        """
+        Add children like add_nested_child, the ones going to the same splitter or to this item at once,
+        so an attached item is changed once per splitter instead of once per child
+        """
+        i = 0
+        while i < len(items):
+            splitter = self.open_splitter()
+            if splitter is not None:
+                room = splitter.maxChildCount - splitter.childCount()
+                splitter.addChildren(items[i:i + room])
+                i += room
+            elif 0 < self.next_splitter_index() < self.maxChildCount or self.childCount() == self.maxChildCount:
+                # A splitter is inserted
+                self.add_nested_child(items[i])
+                i += 1
+            else:
+                end = len(items)
+                if self.childCount() < self.maxChildCount:
+                    end = min(end, i + self.maxChildCount - self.childCount())
+                # A splitter among them is looked at for the next children, as add_nested_child would
+                end = next((j + 1 for j in range(i, end) if getattr(items[j], "bIsSplitter", False)), end)
+                self.addChildren(items[i:end])
+                i = end
+
     def animation_count(self, state=Qt.Unchecked):
         if self.bIsSplitter or not self.is_anim():
             counter = 0
@@ -122,9 +236,9 @@ class AnimTreeItem(QTreeWidgetItem):
             elt = ET.SubElement(parent, "folder" + str(level))
             elt.set("n", self.text(widget.AnimTreeWidget.AnimTreeWidget.COLUMN.NAME.value))
             if self.bIsSplitter:
-                elt.set("i", self.text(widget.AnimTreeWidget.AnimTreeWidget.COLUMN.ICON.value) or get_config().get("PLUGIN", "defaultSetIcon"))
+                elt.set("i", self.text(widget.AnimTreeWidget.AnimTreeWidget.COLUMN.ICON.value) or get_settings().defaultSetIcon)
             else:
-                elt.set("i", self.text(widget.AnimTreeWidget.AnimTreeWidget.COLUMN.ICON.value) or get_config().get("PLUGIN", "defaultFolderIcon"))
+                elt.set("i", self.text(widget.AnimTreeWidget.AnimTreeWidget.COLUMN.ICON.value) or get_settings().defaultFolderIcon)
 
             for i in range(self.childCount()):
                 child = self.child(i)
@@ -137,7 +251,7 @@ class AnimTreeItem(QTreeWidgetItem):
         else:
             entry = ET.SubElement(parent, "entry")
             entry.set("n", self.text(widget.AnimTreeWidget.AnimTreeWidget.COLUMN.NAME.value))
-            entry.set("i", self.text(widget.AnimTreeWidget.AnimTreeWidget.COLUMN.ICON.value) or get_config().get("PLUGIN", "defaultAnimationIcon"))
+            entry.set("i", self.text(widget.AnimTreeWidget.AnimTreeWidget.COLUMN.ICON.value) or get_settings().defaultAnimationIcon)
             entry.set("id", self.text(widget.AnimTreeWidget.AnimTreeWidget.COLUMN.ID.value))
 
     def flags(self):
@@ -161,7 +275,7 @@ class AnimTreeItem(QTreeWidgetItem):
             index = self.next_splitter_index()
         splitter = AnimTreeItem()
         splitter.setText(0, "Set " + str(index+1))
-        splitter.setText(widget.AnimTreeWidget.AnimTreeWidget.COLUMN.ICON.value, get_config().get("PLUGIN", "defaultSetIcon"))
+        splitter.setText(widget.AnimTreeWidget.AnimTreeWidget.COLUMN.ICON.value, get_settings().defaultSetIcon)
         splitter.bIsSplitter = True
         self.insertChild(index, splitter)
         self.splitterCounter += 1
@@ -179,8 +293,8 @@ class AnimTreeItem(QTreeWidgetItem):
 
     def set_animation(self, animation, i):
         self.setFlags(self.flags() ^ Qt.ItemIsDropEnabled)
-        self.setText(widget.AnimTreeWidget.AnimTreeWidget.COLUMN.NAME.value, animation.parse_stage_name(i)[slice(-get_config().getint("PLUGIN", "maxItemStringLength"), None)])
-        self.setText(widget.AnimTreeWidget.AnimTreeWidget.COLUMN.ICON.value, get_config().get("PLUGIN", "defaultAnimationIcon"))
+        self.setText(widget.AnimTreeWidget.AnimTreeWidget.COLUMN.NAME.value, animation.parse_stage_name(i)[slice(-get_settings().maxItemStringLength, None)])
+        self.setText(widget.AnimTreeWidget.AnimTreeWidget.COLUMN.ICON.value, get_settings().defaultAnimationIcon)
         self.setText(widget.AnimTreeWidget.AnimTreeWidget.COLUMN.TYPE.value, animation.type.name)
         self.setText(widget.AnimTreeWidget.AnimTreeWidget.COLUMN.OPTIONS.value, str([x.name for x in animation.options]))
         self.setText(widget.AnimTreeWidget.AnimTreeWidget.COLUMN.ID.value, str(animation.stages[i]))
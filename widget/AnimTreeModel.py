@@ -0,0 +1,382 @@
+from PyQt5.QtCore import Qt, QAbstractItemModel, QModelIndex
+from PyQt5.QtGui import QBrush
+
+
+class AnimTreeModel(QAbstractItemModel):
+    """
+    Item model over a data.Menu.Menu. Rows are created lazily : children of a node are only
+    exposed to the view, by batches, once it asks for them (canFetchMore/fetchMore).
+    """
+
+    # Columns shown by the view, same names as AnimTreeWidget.COLUMN
+    COLUMNS = ("NAME", "ICON", "ID")
+    NAME, ICON, ID = range(3)
+
+    FETCH_BATCH = 256
+
+    HIGHLIGHT_BRUSH = QBrush(Qt.yellow)
+
+    def __init__(self, menu, parent=None):
+        super().__init__(parent)
+        self.menu = menu
+        # Number of children exposed to the view, per node
+        self.fetched = {}
+        # Nodes found by the last search
+        self.highlighted = set()
+        # Children and parents as the view knew them, while the view saves its state before a relayout
+        self.staleChildren = {}
+        self.staleParents = {}
+
+    def node(self, index):
+        if index.isValid():
+            return index.internalPointer()
+        return self.menu.root
+
+    def index_of(self, node, column=0):
+        if node is None or node.is_root:
+            return QModelIndex()
+        parent = self.staleParents.get(node)
+        if parent is not None:
+            return self.createIndex(self.staleChildren[parent].index(node), column, node)
+        return self.createIndex(node.row(), column, node)
+
+    def fetch_until(self, node):
+        """ Expose rows of the parents of node until node itself is exposed """
+        path = []
+        while node is not None and not node.is_root:
+            path.append(node)
+            node = node.parent
+        for node in reversed(path):
+            parent_index = self.index_of(node.parent)
+            while self.fetched.get(node.parent, 0) <= node.row():
+                self.fetchMore(parent_index)
+
+    def highlight(self, nodes):
+        """ Highlight nodes, instead of the ones highlighted before """
+        changed = self.highlighted.symmetric_difference(nodes)
+        self.highlighted = set(nodes)
+        for node in changed:
+            if node.parent is not None and self.fetched.get(node.parent, 0) > node.row():
+                index = self.index_of(node)
+                self.dataChanged.emit(index, index, [Qt.BackgroundRole])
+
+    def clear(self):
+        """ Clear the menu, removing every row from the view """
+        count = self.fetched.get(self.menu.root, 0)
+        if count:
+            self.beginRemoveRows(QModelIndex(), 0, count - 1)
+        self.menu.clear()
+        self.fetched = {}
+        self.highlighted = set()
+        if count:
+            self.endRemoveRows()
+
+    # ----- Structure -----
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self.node(parent)
+        if 0 <= row < self.fetched.get(node, 0) and 0 <= column < len(self.COLUMNS):
+            return self.createIndex(row, column, self.staleChildren.get(node, node.children)[row])
+        return QModelIndex()
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        node = index.internalPointer()
+        return self.index_of(self.staleParents.get(node, node.parent))
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return self.fetched.get(self.node(parent), 0)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.COLUMNS)
+
+    def hasChildren(self, parent=QModelIndex()):
+        return bool(self.node(parent).children)
+
+    def canFetchMore(self, parent):
+        if self.staleChildren:
+            # The view is being told about a change, see rows_changed
+            return False
+        node = self.node(parent)
+        return self.fetched.get(node, 0) < len(node.children)
+
+    def fetchMore(self, parent):
+        node = self.node(parent)
+        first = self.fetched.get(node, 0)
+        last = min(first + self.FETCH_BATCH, len(node.children)) - 1
+        if last < first:
+            return
+        self.beginInsertRows(parent, first, last)
+        self.fetched[node] = last + 1
+        self.endInsertRows()
+
+    def exposed_rows(self, node):
+        """ :return: children the view knows about, of node and of its children, by parent. See children_added """
+        rows = {node: node.children[:self.fetched.get(node, 0)]}
+        for child in rows[node]:
+            if child in self.fetched:
+                rows[child] = child.children[:self.fetched[child]]
+        return rows
+
+    def is_exposed(self, node):
+        """ :return: whether node and its ancestors are rows of the view """
+        while not node.is_root:
+            if node.parent is None or node.row() >= self.fetched.get(node.parent, 0):
+                return False
+            node = node.parent
+        return True
+
+    def children_added(self, node, rows):
+        """
+        Expose children added to node and to its splitters, rows being exposed_rows of node before they were added.
+        New rows are inserted after the exposed ones when these stayed in place, see relayout when they moved
+        """
+        if not self.is_exposed(node):
+            return
+        for parent, children in rows.items():
+            if len(parent.children) < len(children) or any(a is not b for a, b in zip(children, parent.children)):
+                self.relayout(rows)
+                break
+
+        self.fetchMore(self.index_of(node))
+        # Splitters only get children appended
+        for child in node.children[:self.fetched[node]]:
+            if child.bIsSplitter and child in self.fetched:
+                self.fetchMore(self.index_of(child))
+
+    def snapshot(self, nodes):
+        """
+        Rows the view knows about, before nodes get children removed, inserted or moved. See rows_changed
+        :param nodes: nodes whose children change. Their exposed splitters are included
+        :return: (children exposed, number of children), by parent
+        """
+        rows = {}
+        for node in nodes:
+            if node in rows or not self.is_exposed(node):
+                continue
+            for parent, children in self.exposed_rows(node).items():
+                rows[parent] = (children, len(parent.children))
+        return rows
+
+    def rows_changed(self, rows):
+        """
+        Notify the view of the rows removed and inserted since rows were taken, see snapshot.
+        The view is told about the rows it knew, which are updated one range at a time : removed rows first,
+        deepest parents first, then inserted rows, top parents first. A node moved is removed then inserted.
+        Parents whose rows were all exposed get every new row, others keep as many exposed rows as before
+        """
+        self.staleChildren = {parent: list(children) for parent, (children, count) in rows.items()}
+        self.staleParents = {child: parent for parent, children in self.staleChildren.items() for child in children}
+        removed = []
+
+        def depth(node, parents):
+            level = 0
+            while node is not None and not node.is_root:
+                node = parents(node)
+                level += 1
+            return level if node is not None else None
+
+        old_parent = lambda node: self.staleParents.get(node, node.parent)
+        for parent in sorted(rows, key=lambda node: depth(node, old_parent), reverse=True):
+            children = self.staleChildren[parent]
+            rows_now = {id(child): row for row, child in enumerate(parent.children)}
+            # Children still there in the same order are kept, the others are removed by ranges, from the end
+            kept = []
+            last = -1
+            for child in children:
+                row = rows_now.get(id(child), -1)
+                kept.append(row > last)
+                if row > last:
+                    last = row
+            end = len(children)
+            while end > 0:
+                if kept[end - 1]:
+                    end -= 1
+                    continue
+                start = end - 1
+                while start > 0 and not kept[start - 1]:
+                    start -= 1
+                self.beginRemoveRows(self.index_of(parent), start, end - 1)
+                for child in children[start:end]:
+                    del self.staleParents[child]
+                    removed.append(child)
+                del children[start:end]
+                self.fetched[parent] = len(children)
+                self.endRemoveRows()
+                end = start
+
+        for parent in sorted(rows, key=lambda node: depth(node, lambda child: child.parent) or 0):
+            children = self.staleChildren[parent]
+            if not self.in_view(parent):
+                self.fetched.pop(parent, None)
+                continue
+            new_children = parent.children
+            old_exposed, old_count = rows[parent]
+            if len(old_exposed) == old_count:
+                count = len(new_children)
+            else:
+                count = min(len(new_children), len(old_exposed))
+            if children:
+                count = max(count, new_children.index(children[-1]) + 1)
+
+            row = 0
+            while row < count:
+                if row < len(children) and children[row] is new_children[row]:
+                    row += 1
+                    continue
+                following = children[row] if row < len(children) else None
+                end = row
+                while end < count and new_children[end] is not following:
+                    end += 1
+                self.beginInsertRows(self.index_of(parent), row, end - 1)
+                children[row:row] = new_children[row:end]
+                for child in new_children[row:end]:
+                    self.staleParents[child] = parent
+                self.fetched[parent] = len(children)
+                self.endInsertRows()
+                row = end
+
+        self.staleChildren = {}
+        self.staleParents = {}
+        for node in removed:
+            if depth(node, lambda child: child.parent) is None:
+                # Removed from the menu
+                self.forget(node)
+                self.highlighted.discard(node)
+
+    def in_view(self, node):
+        """ :return: whether node is a row of the view, while rows_changed updates it """
+        while not node.is_root:
+            parent = self.staleParents.get(node)
+            if parent is None:
+                parent = node.parent
+                if parent is None or parent in self.staleChildren or node.row() >= self.fetched.get(parent, 0):
+                    return False
+            node = parent
+        return node is self.menu.root
+
+    def relayout(self, rows):
+        """
+        Notify the view rows, exposed_rows before a change, were reorganized. Like pagination moving children in
+        a splitter. Rows the view keeps track of (expanded, selected, current) follow their node
+        """
+        # The view saves its state on the rows it knew
+        self.staleChildren = rows
+        self.staleParents = {child: parent for parent, children in rows.items() for child in children}
+        self.layoutAboutToBeChanged.emit()
+        self.staleChildren = {}
+        self.staleParents = {}
+
+        for parent, children in rows.items():
+            self.fetched[parent] = min(len(children), len(parent.children))
+        old_indexes = self.persistentIndexList()
+        new_indexes = []
+        for index in old_indexes:
+            node = index.internalPointer()
+            path = []
+            while node.parent is not None:
+                path.append(node)
+                node = node.parent
+            if not node.is_root:
+                # Removed from the menu
+                new_indexes.append(QModelIndex())
+                continue
+            for node in path:
+                self.fetched[node.parent] = max(self.fetched.get(node.parent, 0), node.row() + 1)
+            new_indexes.append(self.index_of(index.internalPointer(), index.column()))
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+
+    # ----- Data -----
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() == self.NAME:
+            flags |= Qt.ItemIsUserCheckable | Qt.ItemIsEditable
+        elif index.column() == self.ICON:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        column = index.column()
+
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            if column == self.NAME:
+                return node.name
+            if column == self.ICON:
+                return node.icon
+            return node.anim_id
+        if role == Qt.CheckStateRole and column == self.NAME:
+            return self.check_state(node)
+        if role == Qt.TextAlignmentRole and column == self.ICON:
+            return Qt.AlignCenter
+        if role == Qt.BackgroundRole and column == self.NAME and node in self.highlighted:
+            return self.HIGHLIGHT_BRUSH
+        return None
+
+    @staticmethod
+    def check_state(node):
+        if not node.checked:
+            return Qt.Unchecked
+        if any(not child.checked for child in node.children):
+            return Qt.PartiallyChecked
+        return Qt.Checked
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid():
+            return False
+        node = index.internalPointer()
+
+        if role == Qt.EditRole and index.column() in (self.NAME, self.ICON):
+            if index.column() == self.NAME:
+                node.name = str(value)
+            else:
+                node.icon = str(value)
+            self.dataChanged.emit(index, index, [role])
+            return True
+
+        if role == Qt.CheckStateRole and index.column() == self.NAME:
+            self.menu.set_checked(node, value != Qt.Unchecked)
+            self.check_state_changed(node)
+            return True
+        return False
+
+    def check_state_changed(self, node=None):
+        """ Check boxes of descendants and ancestors changed too, a range of indexes makes the view repaint them all """
+        if node is None or node.is_root:
+            node = self.menu.root.children[0] if self.menu.root.children else None
+        if node is not None and self.index_of(node).isValid():
+            self.dataChanged.emit(self.index_of(node, self.NAME), self.index_of(node, self.ID), [Qt.CheckStateRole])
+
+    # ----- Edition -----
+
+    def remove_node(self, node):
+        """ Remove a node from the menu, and from the view if it was exposed """
+        parent = node.parent
+        row = node.row()
+        exposed = row < self.fetched.get(parent, 0)
+        if exposed:
+            self.beginRemoveRows(self.index_of(parent), row, row)
+        self.menu.remove([node])
+        self.forget(node)
+        if exposed:
+            self.fetched[parent] -= 1
+            self.endRemoveRows()
+
+    def forget(self, node):
+        """ Drop the fetch state of a node and its descendants """
+        for child in node.iter_subtree():
+            self.fetched.pop(child, None)
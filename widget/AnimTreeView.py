@@ -0,0 +1,288 @@
+import logging
+log = logging.getLogger(__name__)
+
+from data.Catalog import Catalog
+from data.Menu import Menu
+from data.SearchIndex import SearchIndex
+from widget.QuickyGui import *
+from widget.AnimTreeModel import AnimTreeModel
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtWidgets import QHeaderView, QTreeView, QMessageBox
+from PyQt5.QtGui import QCursor
+
+
+class AnimTreeView(QTreeView):
+    """
+    Model/view counterpart of AnimTreeWidget, for very large menus.
+    Animations are kept in a data.Menu.Menu and rows are only created when displayed.
+    """
+
+    animationCountChanged = pyqtSignal(int)
+
+    # Same as AnimTreeWidget
+    SEARCH_MIN_LENGTH = 2
+    SEARCH_LIMIT = 500
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.menu = Menu()
+        self.animModel = AnimTreeModel(self.menu, self)
+        self.setModel(self.animModel)
+
+        self.header().setDefaultAlignment(Qt.AlignHCenter)
+        self.header().setMinimumSectionSize(200)
+        self.header().setSectionResizeMode(QHeaderView.Interactive)
+        self.header().setFont(get_normal_font())
+        self.setColumnWidth(AnimTreeModel.NAME, 400)
+        self.setColumnWidth(AnimTreeModel.ICON, 400)
+        self.setColumnWidth(AnimTreeModel.ID, 200)
+
+        # Every row has the same height, so the view does not need to measure them
+        self.setUniformRowHeights(True)
+        self.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.customContextMenuRequested.connect(self.open_menu)
+        self.setAlternatingRowColors(True)
+        self.setEditTriggers(QTreeView.DoubleClicked | QTreeView.EditKeyPressed)
+        self.setSelectionMode(self.ExtendedSelection)
+
+        self.animModel.dataChanged.connect(self.slot_data_changed)
+
+        # Nodes by name, id, file and anim object. Edits mark it stale, so it is built again on the next search
+        self.searchIndex = SearchIndex()
+        self.bSearchIndexStale = True
+
+    def selected_nodes(self):
+        return [index.internalPointer() for index in self.selectionModel().selectedRows(AnimTreeModel.NAME)]
+
+    def action_insert_parent(self):
+        items = self.top_nodes(self.selected_nodes())
+        if not items:
+            return
+        rows = self.animModel.snapshot([item.parent for item in items])
+        self.menu.insert_parent(items)
+        self.animModel.rows_changed(rows)
+        self.menu_changed()
+
+    def action_move_up(self):
+        items = self.top_nodes(self.selected_nodes())
+        rows = self.animModel.snapshot([parent for item in items for parent in (item.parent, item.parent.parent)
+                                        if parent is not None])
+        for item in items:
+            self.menu.move_up(item)
+        self.animModel.rows_changed(rows)
+        self.menu_changed()
+        return True
+
+    def action_merge(self):
+        items = self.selected_nodes()
+        if not items:
+            return
+
+        if len(self.top_nodes(items)) != len(items):
+            QMessageBox.warning(self, "Merge Action", "One selected folder is a parent of another selected folder !\n"
+                                                      "Merging folders with both parent and child selected is not supported !\n"
+                                                      "Select only folders from the same level")
+            return
+
+        for item in items:
+            if item.is_anim():
+                QMessageBox.warning(self, "Merge Action", "Merging animations is not allowed !\n"
+                                                          "Select only folders from the same level")
+                return
+
+        rows = self.animModel.snapshot(items + [item.parent for item in items])
+        self.menu.merge(items)
+        self.animModel.rows_changed(rows)
+        self.menu_changed()
+        return True
+
+    def action_remove_from_parent(self):
+        # Descendants of a removed item go with it
+        for item in self.top_nodes(self.selected_nodes()):
+            self.animModel.remove_node(item)
+            for node in item.iter_subtree():
+                self.searchIndex.remove(node)
+        self.slot_count_changed()
+        return True
+
+    def top_nodes(self, nodes):
+        """ :return: nodes which are not under another one of them, see AnimTreeWidget.top_items """
+        selected = set(nodes)
+        return [node for node in nodes if not any(parent in selected for parent in self.ancestors(node))]
+
+    @staticmethod
+    def ancestors(node):
+        parent = node.parent
+        while parent is not None and not parent.is_root:
+            yield parent
+            parent = parent.parent
+
+    def action_uncheck_all(self):
+        self.menu.check_all(False)
+        self.animModel.check_state_changed()
+
+    def check_all(self):
+        self.menu.check_all(True)
+        self.animModel.check_state_changed()
+
+    def action_check_selection(self):
+        for node in self.top_nodes(self.selected_nodes()):
+            self.menu.set_checked(node, True)
+        self.animModel.check_state_changed()
+
+    def action_uncheck_selection(self):
+        for node in self.top_nodes(self.selected_nodes()):
+            self.menu.set_checked(node, False)
+        self.animModel.check_state_changed()
+
+    def animation_count(self):
+        return self.menu.animation_count()
+
+    def slot_data_changed(self, first, last, roles):
+        if Qt.CheckStateRole in roles:
+            self.slot_count_changed()
+        if Qt.EditRole in roles and not self.bSearchIndexStale:
+            node = first.internalPointer()
+            self.searchIndex.add(node, self.search_texts(node))
+
+    def slot_search_index_stale(self):
+        self.bSearchIndexStale = True
+
+    @staticmethod
+    def search_texts(node):
+        """ :return: texts a node is searched by, same as AnimTreeWidget.search_texts """
+        animation = node.animation
+        if animation is None:
+            return [node.name, node.anim_id]
+        return [node.name, node.anim_id, animation.stages_file[node.stage], animation.stages_obj[node.stage]]
+
+    def search(self, text):
+        """
+        Highlight nodes whose name, id, file or anim object contain text, and expand their parents.
+        See AnimTreeWidget.search
+        :return: number of nodes found, at most SEARCH_LIMIT
+        """
+        if len(text) < self.SEARCH_MIN_LENGTH:
+            self.animModel.highlight([])
+            return 0
+
+        if self.bSearchIndexStale:
+            self.searchIndex.clear()
+            for node in self.menu.root.iter_subtree():
+                if not node.is_root:
+                    self.searchIndex.add(node, self.search_texts(node))
+            self.bSearchIndexStale = False
+
+        nodes = self.searchIndex.search(text, self.SEARCH_LIMIT)
+        # With a layout pending, rows fetched and expanded are only recorded, they are laid out once
+        self.scheduleDelayedItemsLayout()
+        expanded = set()
+        for node in nodes:
+            self.animModel.fetch_until(node)
+            for parent in self.ancestors(node):
+                if parent not in expanded:
+                    self.expand(self.animModel.index_of(parent))
+                    expanded.add(parent)
+        self.animModel.highlight(nodes)
+        if nodes:
+            self.scrollTo(self.animModel.index_of(nodes[0]))
+        return len(nodes)
+
+    def slot_count_changed(self):
+        self.animationCountChanged.emit(self.menu.animation_count())
+
+    def cleanup(self):
+        # Any folder can be removed or replaced by its child
+        rows = self.animModel.snapshot([self.menu.root] + list(self.animModel.fetched))
+        self.menu.cleanup()
+        self.animModel.rows_changed(rows)
+        self.menu_changed()
+
+    def clear(self):
+        self.animModel.clear()
+        self.menu_changed()
+
+    def ask_clear_or_append(self):
+        """
+        When the menu is not empty, ask whether it should be cleared or appended to
+        :return: animations id to ignore, which are the ones already in the menu if the user wants to
+        """
+        animations = set()
+
+        if self.menu.root.children:
+            answer = clear_or_append(self)
+            if answer == QMessageBox.Yes:
+                self.clear()
+            elif answer == QMessageBox.No:
+                if question(None, "Duplicates ?", "Do you want to ignore already existing animations ?") == QMessageBox.Yes:
+                    animations = self.menu.animationIds
+        return animations
+
+    def create_from_xml(self, xml_file):
+        animations = self.ask_clear_or_append()
+
+        root = self.menu.root
+        rows = self.animModel.exposed_rows(root)
+        counter = self.menu.add_from_xml(xml_file, animations)
+        self.animModel.children_added(root, rows)
+        self.menu_changed()
+        return counter
+
+    def create_from_packages(self, packages):
+        self.begin_packages()
+        self.add_packages(packages)
+        return self.end_packages()
+
+    def begin_packages(self):
+        animations = self.ask_clear_or_append()
+        # Rows are inserted while a scan fills the menu, so expansion, selection and scrolling are kept
+        root = self.menu.root
+        rows = self.animModel.exposed_rows(root)
+        self.menu.begin_packages(animations)
+        self.animModel.children_added(root, rows)
+        if self.animModel.is_exposed(self.menu.pendingRoot):
+            self.expand(self.animModel.index_of(self.menu.pendingRoot))
+        self.menu_changed()
+
+    def add_packages(self, packages):
+        self.add_catalog(Catalog.from_packages(packages))
+
+    def add_catalog(self, catalog):
+        pending_root = self.menu.pendingRoot
+        rows = self.animModel.exposed_rows(pending_root)
+        self.menu.add_pending_catalog(catalog)
+        self.animModel.children_added(pending_root, rows)
+        self.menu_changed()
+
+    def end_packages(self):
+        root = self.menu.root
+        pending_root = self.menu.pendingRoot
+        rows = self.animModel.exposed_rows(root)
+        top = self.indexAt(self.viewport().rect().topLeft()).internalPointer()
+        duplicate = self.menu.end_packages()
+        self.animModel.children_added(root, rows)
+        self.animModel.forget(pending_root)
+        # Packages move up one level, keep the first visible row on top
+        if top is not None and top is not pending_root:
+            self.animModel.fetch_until(top)
+            self.scrollTo(self.animModel.index_of(top), self.PositionAtTop)
+        self.menu_changed()
+        return duplicate
+
+    def menu_changed(self):
+        """ Rows were inserted, removed or moved """
+        self.slot_search_index_stale()
+        self.slot_count_changed()
+
+    def open_menu(self):
+        selection = self.selected_nodes()
+        if selection:
+            create_tree_menu(self).exec_(QCursor.pos())
+        return
+
+    def to_xml(self, plugin_name):
+        return self.menu.to_xml(plugin_name)
+
+    def write_xml(self, writer, plugin_name):
+        self.menu.write_xml(writer, plugin_name)
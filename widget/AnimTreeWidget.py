@@ -1,19 +1,40 @@
 import xml.etree.ElementTree as ET
 import widget.AnimTreeItem
 
+from bisect import bisect_left
+from collections import Counter
+
 import logging
 log = logging.getLogger(__name__)
 
 from enum import Enum
-from util.Config import get_config
+from util import Timing
+from util.Config import get_settings
+from util.MyoReader import iter_myo
+from data.Catalog import Catalog
+from data.Menu import build_package
+from data.SearchIndex import SearchIndex
 from widget.QuickyGui import *
-from PyQt5.QtCore import Qt
-from PyQt5.QtWidgets import QHeaderView, QMenu, QTreeWidget, QMessageBox
-from PyQt5.QtGui import QCursor
+from PyQt5.QtCore import Qt, pyqtSignal, QByteArray, QMimeData
+from PyQt5.QtWidgets import QHeaderView, QTreeView, QTreeWidget, QMessageBox
+from PyQt5.QtGui import QCursor, QBrush
 
 
 class AnimTreeWidget(QTreeWidget):
 
+    animationCountChanged = pyqtSignal(int)
+
+    # Items read from a plugin before they are attached to the tree
+    LOAD_BATCH = 2000
+
+    # Shortest query searched, and most items highlighted by a search
+    SEARCH_MIN_LENGTH = 2
+    SEARCH_LIMIT = 500
+    SEARCH_BRUSH = QBrush(Qt.yellow)
+
+    # Mime type of internal drags, which carry no data : dropEvent moves the selected items themselves
+    ITEMS_MIME_TYPE = "application/x-oselector-items"
+
     class ROLE(Enum):
         FOLDER = 1001
         SPLITTER = 1002
@@ -28,6 +49,8 @@ class AnimTreeWidget(QTreeWidget):
         FILE = 5
         ANIM_OBJ = 6
 
+    SEARCH_COLUMNS = (COLUMN.NAME.value, COLUMN.ID.value, COLUMN.FILE.value, COLUMN.ANIM_OBJ.value)
+
     def __init__(self, parent=None):
         super().__init__(parent)
 
@@ -62,74 +85,85 @@ class AnimTreeWidget(QTreeWidget):
         self.setEditTriggers(QTreeWidget.DoubleClicked | QTreeWidget.EditKeyPressed)
         self.setSelectionMode(self.ExtendedSelection)
 
-    def action_insert_parent(self):
-        items = self.selectedItems()
-        newParent = widget.AnimTreeItem.AnimTreeItem()
-        newParent.setText(0, "New Parent")
+        # Number of items in the tree for each animation id
+        self.animationIds = Counter()
 
-        # We want the lowest parent (Meaning the parent the most close to the root)
-        items_parent = []
-        for item in items:
-            if item in items_parent:
-                items_parent.clear()
+        # Checked animations in the tree, each folder keeping the count of its own subtree
+        self.checkedCount = 0
+        self.itemChanged.connect(self.slot_item_changed)
+        self.model().rowsInserted.connect(self.slot_rows_inserted)
+        self.model().rowsAboutToBeRemoved.connect(self.slot_rows_about_to_be_removed)
+        self.model().modelReset.connect(self.slot_model_reset)
 
-            item_parent = item.parent()
-            if not item_parent:
-                item_parent = self.invisibleRootItem()
+        # Items by name, id, file and anim object, kept up to date by the same slots as counts.
+        # Items moved within the tree (bMovingItems set) keep their entry
+        self.searchIndex = SearchIndex()
+        self.searchResults = []
+        self.bMovingItems = False
 
-            if not item_parent in items:
-                items_parent.append((item_parent, item))
+        self.pendingRoot = None
+        self.pendingAnimations = set()
+        self.pendingDuplicates = 0
+        self.bWasSortingEnabled = False
 
-        parent, item = items_parent[0]
+    def action_insert_parent(self):
+        items = self.top_items(self.selectedItems())
+        if not items:
+            return
+        newParent = widget.AnimTreeItem.AnimTreeItem()
+        newParent.setText(0, "New Parent")
 
-        index = parent.indexOfChild(item)
-        parent.insertChild(index, newParent)
+        # The new parent takes the place of the first item
+        parent = items[0].parent() or self.invisibleRootItem()
+        row = parent.indexOfChild(items[0])
 
+        self.suspend_updates()
+        self.bMovingItems = True
+        taken = self.take_items(items)
+        row -= bisect_left(taken[id(parent)], row)
+        # Filled while detached, then attached at once
+        newParent.add_nested_children(items)
         for item in items:
-            item_parent = item.parent()
-            if not item_parent:
-                item_parent = self.invisibleRootItem()
-
-            item_index = item_parent.indexOfChild(item)
-            child = item_parent.takeChild(item_index)
-            newParent.add_nested_child(child)
+            # Counted again once attached, a moved splitter may have received items
+            if getattr(item, "bIsSplitter", False):
+                item.checkedCount = None
+        parent.insertChild(row, newParent)
+        self.bMovingItems = False
+        self.index_folders(newParent)
+        self.resume_updates()
         return
 
     def action_move_up(self, item=None):
-        if not item:
-            items = self.selectedItems()
-            for item in items:
-                self.action_move_up(item)
-            return True
-
-        n1 = item.parent()
-        if not n1:
+        items = self.top_items(self.selectedItems() if not item else [item])
+        root = self.invisibleRootItem()
+        # Top level items stay where they are
+        items = [item for item in items if item.parent()]
+        if not items:
             return False
 
-        n2 = n1.parent()
-        if not n2:
-            n2 = self.invisibleRootItem()
-
-        item_index = n1.indexOfChild(item)
-        item = n1.takeChild(item_index)
-        n2.addChild(item)
+        # Each item goes to the end of its grandparent, known before items are taken
+        groups = self.group_by_parent(items, lambda item: item.parent().parent() or root)
+        self.suspend_updates()
+        self.bMovingItems = True
+        self.take_items(items)
+        for n2, children in groups.values():
+            n2.addChildren(children)
+        self.bMovingItems = False
+        self.resume_updates()
         return True
 
     def action_merge(self):
         items = self.selectedItems()
+        if not items:
+            return
 
-        items_parent = []
-        for item in items:
-            item_parent = item.parent()
-            if not items_parent:
-                items_parent = self.invisibleRootItem()
-
-            if item_parent in items:
-                QMessageBox.warning(self, "Merge Action", "One selected folder is a parent of another selected folder !\n"
-                                                          "Merging folders with both parent and child selected is not supported !\n"
-                                                          "Select only folders from the same level")
-                return
+        if len(self.top_items(items)) != len(items):
+            QMessageBox.warning(self, "Merge Action", "One selected folder is a parent of another selected folder !\n"
+                                                      "Merging folders with both parent and child selected is not supported !\n"
+                                                      "Select only folders from the same level")
+            return
 
+        for item in items:
             if item.is_anim():
                 QMessageBox.warning(self, "Merge Action", "Merging animations is not allowed !\n"
                                                           "Select only folders from the same level")
@@ -137,36 +171,166 @@ class AnimTreeWidget(QTreeWidget):
 
         parent = items.pop(0)
 
-        p2 = parent.parent()
-        if not p2:
-            p2 = self.invisibleRootItem()
-
+        self.suspend_updates()
+        self.clearSelection()
+        self.bMovingItems = True
         for item in items:
-            for child_index in range(item.childCount()):
-                child = item.takeChild(0)
-                parent.add_nested_child(child)
-            p2.removeChild(item)
-
+            parent.add_nested_children(item.takeChildren())
+        self.bMovingItems = False
+        self.index_folders(parent)
+        # Merged folders may be in other splitters than the first one
+        self.take_items(items)
+        parent.setSelected(True)
+        self.resume_updates()
         return True
 
     def action_remove_from_parent(self, item=None):
-        if not item:
-            items = self.selectedItems()
-            for item in items:
-                self.action_remove_from_parent(item)
-            return True
+        items = self.top_items(self.selectedItems() if not item else [item])
 
-        parent = item.parent()
-        if not parent:
-            parent = self.invisibleRootItem()
-        parent.removeChild(item)
+        self.suspend_updates()
+        self.take_items(items)
+        for item in items:
+            self.unregister_animations(item)
+        self.resume_updates()
+        return True
+
+    @staticmethod
+    def top_items(items):
+        """ :return: items which are not under another one of them, the others moving with it """
+        selected = {id(item) for item in items}
+        top = []
+        for item in items:
+            ancestor = item.parent()
+            while ancestor is not None and id(ancestor) not in selected:
+                ancestor = ancestor.parent()
+            if ancestor is None:
+                top.append(item)
+        return top
+
+    @staticmethod
+    def group_by_parent(items, parent_of):
+        """ :return: dict of (parent, items) by id of parent, items keeping their order """
+        groups = {}
+        for item in items:
+            parent = parent_of(item)
+            groups.setdefault(id(parent), (parent, []))[1].append(item)
+        return groups
+
+    def take_items(self, items):
+        """
+        Take items out of the tree, each parent once, from its last row.
+        The selection is cleared first, Qt updating every selected range for each row taken otherwise
+        :param items: items of the tree, none under another one of them
+        :return: dict of the rows taken, in ascending order, by id of their parent
+        """
+        root = self.invisibleRootItem()
+        self.clearSelection()
+        taken = {}
+        for key, (parent, children) in self.group_by_parent(items, lambda item: item.parent() or root).items():
+            if len(children) == parent.childCount():
+                taken[key] = list(range(len(children)))
+                parent.takeChildren()
+                continue
+            rows = {id(parent.child(row)): row for row in range(parent.childCount())}
+            taken[key] = sorted(rows[id(child)] for child in children)
+            for row in reversed(taken[key]):
+                parent.takeChild(row)
+        return taken
+
+    def mimeTypes(self):
+        return [self.ITEMS_MIME_TYPE]
+
+    def mimeData(self, items):
+        """ :return: mime data of an internal drag, items and their columns are not serialized """
+        data = QMimeData()
+        data.setData(self.ITEMS_MIME_TYPE, QByteArray())
+        return data
+
+    def dropMimeData(self, parent, index, data, action):
+        # Items dragged inside the tree are moved by dropEvent, they can not be decoded
+        if data.hasFormat(self.ITEMS_MIME_TYPE):
+            return False
+        return super().dropMimeData(parent, index, data, action)
+
+    def dropEvent(self, event):
+        """
+        Move the dragged items themselves, with their descendants, to the drop position.
+        Items dropped on a folder are paginated in it like merged ones, the others are inserted where dropped
+        """
+        if event.source() is not self or not event.mimeData().hasFormat(self.ITEMS_MIME_TYPE):
+            return super().dropEvent(event)
+
+        root = self.invisibleRootItem()
+        target = self.itemAt(event.pos())
+        position = self.dropIndicatorPosition()
+        if target is None or position == self.OnViewport:
+            parent, row = root, root.childCount()
+        elif position == self.OnItem:
+            parent, row = target, -1
+        else:
+            parent = target.parent() or root
+            row = parent.indexOfChild(target) + (1 if position == self.BelowItem else 0)
+
+        items = self.top_items(self.selectedItems())
+        dragged = {id(item) for item in items}
+        ancestor = parent
+        while ancestor is not None and id(ancestor) not in dragged:
+            ancestor = ancestor.parent()
+
+        # Items can not be dropped in themselves
+        if items and ancestor is None:
+            self.suspend_updates()
+            self.bMovingItems = True
+            taken = self.take_items(items)
+            if row < 0:
+                try:
+                    test = parent.bIsSplitter
+                except AttributeError:
+                    widget.AnimTreeItem.AnimTreeItem.convert_to_anim_tree_item(parent)
+                parent.add_nested_children(items)
+            else:
+                parent.insertChildren(row - bisect_left(taken.get(id(parent), []), row), items)
+            self.bMovingItems = False
+            if row < 0:
+                self.index_folders(parent)
+            self.resume_updates()
+
+            # Items are already moved, the view must not remove them once the drag is over
+            event.setDropAction(Qt.CopyAction)
+            event.accept()
+
+        # Ends the drop in the view (auto scroll, state), without the move of QTreeWidget. An accepted event is not
+        # given to the model, which rejects this mime type anyway (see dropMimeData)
+        QTreeView.dropEvent(self, event)
+
+    def index_folders(self, folder):
+        """
+        Index a folder and the splitters add_nested_child created in it while items were moving,
+        the items moved in it being already indexed
+        """
+        stack = [folder]
+        while stack:
+            folder = stack.pop()
+            self.searchIndex.add(folder, self.search_texts(folder))
+            for i in range(folder.childCount()):
+                if folder.child(i) not in self.searchIndex:
+                    stack.append(folder.child(i))
 
     def action_uncheck_all(self):
         root = self.invisibleRootItem()
-        for i in range(root.childCount()):
-            self.check_children(root.child(i), Qt.Unchecked)
+        self.set_check_state([root.child(i) for i in range(root.childCount())], Qt.Unchecked)
+
+    def action_check_selection(self):
+        self.set_check_state(self.selectedItems(), Qt.Checked)
+
+    def action_uncheck_selection(self):
+        self.set_check_state(self.selectedItems(), Qt.Unchecked)
 
     def animation_count(self, state=Qt.Unchecked):
+        """ :return: number of animations whose check state is not state. Cached for Qt.Unchecked """
+        if state == Qt.Unchecked:
+            return self.checkedCount
+
         root = self.invisibleRootItem()
 
         counter = 0
@@ -180,6 +344,177 @@ class AnimTreeWidget(QTreeWidget):
                 counter += child.animation_count(state)
         return counter
 
+    def count_checked(self, item, refresh=False):
+        """
+        Count checked animations of a subtree, reusing counts cached on folders and caching missing ones
+        :param refresh: count again folders already counted
+        :return: number of checked animations
+        """
+        id_column = AnimTreeWidget.COLUMN.ID.value
+        with Timing.span("count") as timing:
+            # Items breadth first, so children come after their parent, with the position of their parent
+            nodes = [item]
+            parents = [-1]
+            counts = [0]
+            counted = []
+            i = 0
+            while i < len(nodes):
+                node = nodes[i]
+                if node.text(id_column):
+                    node.bChecked = node.checkState(0) != Qt.Unchecked
+                    counts[i] = int(node.bChecked)
+                elif not refresh and getattr(node, "checkedCount", None) is not None:
+                    counts[i] = node.checkedCount
+                else:
+                    counted.append(i)
+                    for row in range(node.childCount()):
+                        nodes.append(node.child(row))
+                        parents.append(i)
+                        counts.append(0)
+                i += 1
+
+            # Children are summed into their parent, last ones first
+            for i in range(len(nodes) - 1, 0, -1):
+                counts[parents[i]] += counts[i]
+            for i in counted:
+                nodes[i].checkedCount = counts[i]
+            timing.add("items", len(nodes))
+        return counts[0]
+
+    @staticmethod
+    def cached_count(item):
+        """ :return: number of checked animations of a counted subtree """
+        if item.text(AnimTreeWidget.COLUMN.ID.value):
+            return int(bool(getattr(item, "bChecked", False)))
+        return getattr(item, "checkedCount", None) or 0
+
+    def propagate_count(self, parent, delta, notify=True):
+        """
+        Add delta to the count of every folder from parent to the root
+        :param notify: emit animationCountChanged
+        """
+        if not delta:
+            return
+        while parent is not None:
+            if getattr(parent, "checkedCount", None) is not None:
+                parent.checkedCount += delta
+            parent = parent.parent()
+        self.checkedCount += delta
+        if notify:
+            self.animationCountChanged.emit(self.checkedCount)
+
+    def item_from_index(self, index):
+        if index.isValid():
+            return self.itemFromIndex(index)
+        return self.invisibleRootItem()
+
+    def slot_item_changed(self, item, column):
+        if column in self.SEARCH_COLUMNS and item in self.searchIndex:
+            self.searchIndex.add(item, self.search_texts(item))
+        if not item.text(AnimTreeWidget.COLUMN.ID.value):
+            return
+        bChecked = item.checkState(0) != Qt.Unchecked
+        previous = getattr(item, "bChecked", None)
+        if previous != bChecked:
+            # An item becoming an animation after its insertion has not been counted yet
+            item.bChecked = bChecked
+            self.propagate_count(item.parent(), int(bChecked) - int(bool(previous)))
+
+    @staticmethod
+    def lower_open_row(parent, row):
+        """ Children of parent changed from row, add_nested_child has to look at them again """
+        if getattr(parent, "firstOpenRow", 0) > row:
+            parent.firstOpenRow = row
+
+    def slot_rows_inserted(self, parent_index, first, last):
+        parent = self.item_from_index(parent_index)
+        self.lower_open_row(parent, first)
+        delta = 0
+        for row in range(first, last + 1):
+            delta += self.count_checked(parent.child(row))
+            if not self.bMovingItems:
+                self.index_subtree(parent.child(row))
+        self.propagate_count(parent if parent_index.isValid() else None, delta)
+
+    def slot_rows_about_to_be_removed(self, parent_index, first, last):
+        parent = self.item_from_index(parent_index)
+        self.lower_open_row(parent, first)
+        if parent_index.isValid() and getattr(parent, "bIsSplitter", False) and parent.parent():
+            # The splitter has room again
+            self.lower_open_row(parent.parent(), parent.parent().indexOfChild(parent))
+        delta = 0
+        for row in range(first, last + 1):
+            delta -= self.cached_count(parent.child(row))
+            if not self.bMovingItems:
+                self.unindex_subtree(parent.child(row))
+        self.propagate_count(parent if parent_index.isValid() else None, delta)
+
+    def slot_model_reset(self):
+        self.checkedCount = self.count_checked(self.invisibleRootItem())
+        self.animationCountChanged.emit(self.checkedCount)
+        self.searchIndex.clear()
+        self.searchResults = []
+        root = self.invisibleRootItem()
+        for i in range(root.childCount()):
+            self.index_subtree(root.child(i))
+
+    @staticmethod
+    def search_texts(item):
+        """ :return: texts an item is searched by """
+        return [item.text(column) for column in AnimTreeWidget.SEARCH_COLUMNS]
+
+    def index_subtree(self, item):
+        # Subtrees are indexed whole, one whose root is indexed was built indexed or moved
+        if item in self.searchIndex:
+            return
+        stack = [item]
+        while stack:
+            item = stack.pop()
+            self.searchIndex.add(item, self.search_texts(item))
+            stack.extend(item.child(i) for i in range(item.childCount()))
+
+    def unindex_subtree(self, item):
+        stack = [item]
+        while stack:
+            item = stack.pop()
+            self.searchIndex.remove(item)
+            stack.extend(item.child(i) for i in range(item.childCount()))
+
+    def search(self, text):
+        """
+        Highlight items whose name, id, file or anim object contain text, and expand their parents.
+        Queries shorter than SEARCH_MIN_LENGTH only clear the previous results
+        :return: number of items found, at most SEARCH_LIMIT
+        """
+        # Backgrounds are only painted : the view is not told about each item, it is repainted once
+        model = self.model()
+        bWereBlocked = model.blockSignals(True)
+        for item in self.searchResults:
+            # Items removed since were unindexed, and may be deleted
+            if item in self.searchIndex:
+                item.setBackground(0, QBrush())
+        self.searchResults = []
+
+        if len(text) >= self.SEARCH_MIN_LENGTH:
+            self.searchResults = self.searchIndex.search(text, self.SEARCH_LIMIT)
+            for item in self.searchResults:
+                item.setBackground(0, self.SEARCH_BRUSH)
+        model.blockSignals(bWereBlocked)
+        self.viewport().update()
+
+        # With a layout pending, expanding only records the items, they are laid out once
+        self.scheduleDelayedItemsLayout()
+        expanded = set()
+        for item in self.searchResults:
+            parent = item.parent()
+            while parent is not None and id(parent) not in expanded:
+                parent.setExpanded(True)
+                expanded.add(id(parent))
+                parent = parent.parent()
+        if self.searchResults:
+            self.scrollToItem(self.searchResults[0])
+        return len(self.searchResults)
+
     def animations_id(self):
         root = self.invisibleRootItem()
 
@@ -196,169 +531,348 @@ class AnimTreeWidget(QTreeWidget):
 
     def check_all(self):
         root = self.invisibleRootItem()
-        for i in range(root.childCount()):
-            self.check_children(root.child(i), Qt.Checked)
+        self.set_check_state([root.child(i) for i in range(root.childCount())], Qt.Checked)
 
     def check_children(self, item, state):
-        item.setCheckState(0, state)
-        for i in range(item.childCount()):
-            self.check_children(item.child(i), state)
+        self.set_check_state([item], state)
+
+    def set_check_state(self, items, state):
+        """
+        Check or uncheck items with their descendants, at once : check boxes are set with the model signals blocked,
+        counts of each subtree are computed again in one pass, then the view is repainted and
+        animationCountChanged emitted once
+        :param items: subtrees or selection, items under another one of them are already part of its subtree
+        """
+        model = self.model()
+        bWereBlocked = model.blockSignals(True)
+        for item in self.top_items(items):
+            parent = item.parent()
+            previous = self.cached_count(item)
+            # Qt sets the descendants of an auto tristate item, folders show the state of their children
+            item.setCheckState(0, state)
+            self.propagate_count(parent, self.count_checked(item, refresh=True) - previous, notify=False)
+        model.blockSignals(bWereBlocked)
+
+        self.viewport().update()
+        self.animationCountChanged.emit(self.checkedCount)
 
     def cleanup(self, item=None):
-        has_been_removed = False
+        """
+        Remove folders without children, and replace folders with a single child by this child, moved to the end
+        of their parent. Items are cleaned after their children, iteratively, and each folder changes once
+        :return: whether item was removed
+        """
+        root = self.invisibleRootItem()
         if not item:
-            item = self.invisibleRootItem()
-
-        if not item.text(AnimTreeWidget.COLUMN.ID.value):
-            if item.childCount() == 0:
-                self.action_remove_from_parent(item)
-                has_been_removed = True
-            else:
-                counter = 0
-                for i in range(item.childCount()):
-                    if not self.cleanup(item.child(counter)):
-                        counter += 1
-
-            if item.childCount() == 1:
-                child = item.child(0)
-                if self.action_move_up(child):
-                    self.action_remove_from_parent(item)
-                    has_been_removed = True
-                self.cleanup(child)
+            item = root
+
+        with Timing.span("cleanup") as timing:
+            self.suspend_updates()
+            # Moved items keep their search entry, removed folders are unindexed by cleanup_leaf and cleanup_steps
+            self.bMovingItems = True
+            # Cleaned folders left empty or holding an empty folder, by id : cleaning them again changes them
+            emptied = {}
+            removed = 0
+            # Cleanup of each folder being cleaned, waiting for the one of its current child
+            stack = []
+            result = self.cleanup_leaf(item, emptied)
+            if result is None:
+                stack.append(self.cleanup_steps(item, emptied))
+            while stack:
+                try:
+                    child = stack[-1].send(result)
+                except StopIteration as stop:
+                    stack.pop()
+                    result = stop.value
+                    removed += result[0]
+                    continue
+                result = self.cleanup_leaf(child, emptied)
+                if result is None:
+                    stack.append(self.cleanup_steps(child, emptied))
+                else:
+                    removed += result[0]
+
+            has_been_removed, moved = result
+            if has_been_removed and item is not root:
+                parent = item.parent() or root
+                self.replace_children(parent, [parent.indexOfChild(item)], moved)
+            self.bMovingItems = False
+            self.resume_updates()
+            timing.add("removed", removed)
         return has_been_removed
 
-    def create_from_xml(self, xml_file):
-
-        animations = []
+    def cleanup_leaf(self, item, emptied):
+        """
+        Cleanup of an animation, or of a folder holding animations only, which needs no step of its own
+        :return: same as cleanup_steps, None for a folder holding folders
+        """
+        id_column = AnimTreeWidget.COLUMN.ID.value
+        if item.text(id_column):
+            return False, []
+        count = item.childCount()
+        if count == 0:
+            self.searchIndex.remove(item)
+            emptied.pop(id(item), None)
+            return True, []
+        for row in range(count):
+            if not item.child(row).text(id_column):
+                return None
+        if count == 1 and item is not self.invisibleRootItem():
+            self.searchIndex.remove(item)
+            return True, [item.child(0)]
+        return False, []
+
+    def cleanup_steps(self, item, emptied):
+        """
+        Cleanup of a folder holding folders, see cleanup. Yields the folders to clean up before going on, and is sent
+        what their cleanup returned. Only item's own children are changed, its parent applies the rest
+        :param emptied: cleaned folders left empty or holding an empty folder, by id
+        :return: whether item is removed, and the items to move to the end of its parent
+        """
+        id_column = AnimTreeWidget.COLUMN.ID.value
+        kept = []
+        removed_rows = []
+        moved = []
+        for row in range(item.childCount()):
+            child = item.child(row)
+            # Animations are left as they are
+            if child.text(id_column):
+                kept.append(child)
+                continue
+            bRemoved, child_moved = yield child
+            if bRemoved:
+                removed_rows.append(row)
+                moved.extend(child_moved)
+            else:
+                kept.append(child)
+        children = kept + moved
+
+        if len(children) == 1:
+            child = children[0]
+            # Top level items stay where they are
+            if item is not self.invisibleRootItem():
+                self.searchIndex.remove(item)
+                emptied.pop(id(item), None)
+                # The child was cleaned already, doing it again only removes the folders it left empty
+                if id(child) in emptied:
+                    bRemoved, child_moved = yield child
+                    if bRemoved:
+                        return True, child_moved
+                return True, [child]
+
+        if removed_rows:
+            self.replace_children(item, removed_rows, moved)
+
+        if len(children) == 1 and id(children[0]) in emptied:
+            bRemoved, child_moved = yield children[0]
+            if bRemoved:
+                self.replace_children(item, [0], child_moved)
+                children = child_moved
+
+        if not children or (emptied and any(id(child) in emptied for child in children)):
+            emptied[id(item)] = item
+        else:
+            emptied.pop(id(item), None)
+        return False, []
+
+    def replace_children(self, parent, rows, moved):
+        """
+        Remove the children of parent at rows, then add moved items at its end.
+        Moved items are detached from the removed folders holding them, once these folders left the tree
+        """
+        # Kept until moved items are detached, a removed folder being deleted deletes the items it still holds
+        removed = [parent.takeChild(row) for row in reversed(rows)]
+        for item in moved:
+            item.parent().removeChild(item)
+        parent.addChildren(moved)
+        del removed
+
+    def clear(self):
+        super().clear()
+        self.animationIds.clear()
+
+    def register_animation(self, anim_id):
+        self.animationIds[anim_id] += 1
+
+    def unregister_animations(self, item):
+        """ Forget animations of an item and its descendants, once removed from the tree """
+        stack = [item]
+        while stack:
+            item = stack.pop()
+            anim_id = item.text(AnimTreeWidget.COLUMN.ID.value)
+            if anim_id:
+                self.animationIds[anim_id] -= 1
+                if self.animationIds[anim_id] <= 0:
+                    del self.animationIds[anim_id]
+            stack.extend(item.child(i) for i in range(item.childCount()))
+
+    def ask_clear_or_append(self):
+        """
+        When the tree is not empty, ask whether it should be cleared or appended to
+        :return: animations id to ignore, which are the ones already in the tree if the user wants to
+        """
+        animations = set()
 
         if self.invisibleRootItem().childCount() > 0:
-            box = QMessageBox()
-            box.setIcon(QMessageBox.Question)
-            box.setWindowTitle('Clear or Append ?')
-            box.setText("Do you want to append new animations to the tree"
-                        "or clear the tree and build a new one from the new animations ?")
-            box.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
-            buttonY = box.button(QMessageBox.Yes)
-            buttonY.setText('Clear')
-            buttonN = box.button(QMessageBox.No)
-            buttonN.setText('Append')
-            box.exec_()
-
-            if box.clickedButton() == buttonY:
+            answer = clear_or_append(self)
+            if answer == QMessageBox.Yes:
                 self.clear()
-            else:
+            elif answer == QMessageBox.No:
                 answer = question(None, "Duplicates ?", "Do you want to ignore already existing animations ?")
                 if answer == QMessageBox.Yes:
-                    animations = self.animations_id()
+                    animations = self.animationIds
+        return animations
+
+    def create_from_xml(self, xml_file):
+
+        animations = self.ask_clear_or_append()
 
-        xml = ET.parse(xml_file)
         root = self.invisibleRootItem()
-        counter = self.add_item_from_xml(root, xml.getroot(), animations)
+        with Timing.span("import") as timing:
+            counter = self.add_items_from_xml(root, xml_file, animations)
+            timing.add("animations", counter)
 
         return counter
 
-    def add_item_from_xml(self, parent, elt, animations):
+    def add_items_from_xml(self, parent, xml_file, animations):
+        """
+        Read a plugin without loading it whole. Its top level folders are built detached, then attached by batches
+        :param animations: animations id to ignore. Animations added by this load are never ignored
+        :return: number of animations added
+        """
+        folder_icon = get_settings().defaultFolderIcon
+        added = set()
         counter = 0
-        duplicate_counter = 0
-        for child in elt:
-            if child.get("id") in animations:
-                duplicate_counter += 1
-                log.info("Duplicate found : " + child.get("n"))
-            else:
-                item = widget.AnimTreeItem.AnimTreeItem()
-                item.setText(self.COLUMN.NAME.value, child.get("n"))
-                item.setText(self.COLUMN.ICON.value, child.get("i") or get_config().get("PLUGIN", "defaultFolderIcon"))
-                if child.get("id"):
-                    counter += 1
-                    item.setText(self.COLUMN.ID.value, child.get("id"))
-                parent.addChild(item)
-                counter += self.add_item_from_xml(item, child, animations)
-        return counter
 
-    def create_from_packages(self, packages):
-
-        animations = []
-        duplicate_counter = 0
+        # Items of the elements being read, from the top level one
+        items = []
+        batch = []
+        batch_size = 0
+        # Depth of the duplicate being skipped, with its children
+        skipped_depth = None
+        for depth, elt in iter_myo(xml_file):
+            if skipped_depth is not None:
+                if elt is None and depth == skipped_depth:
+                    skipped_depth = None
+                continue
+
+            if elt is None:
+                item = items.pop()
+                if not items:
+                    batch.append(item)
+                    if batch_size >= self.LOAD_BATCH:
+                        self.attach_items(parent, batch)
+                        batch = []
+                        batch_size = 0
+                continue
+
+            anim_id = elt.get("id")
+            if anim_id in animations and anim_id not in added:
+                log.info("Duplicate found : %s", elt.get("n"))
+                skipped_depth = depth
+                continue
+
+            item = widget.AnimTreeItem.AnimTreeItem()
+            item.setText(self.COLUMN.NAME.value, elt.get("n"))
+            item.setText(self.COLUMN.ICON.value, elt.get("i") or folder_icon)
+            if anim_id:
+                counter += 1
+                item.setText(self.COLUMN.ID.value, anim_id)
+                self.register_animation(anim_id)
+                added.add(anim_id)
+            if items:
+                items[-1].addChild(item)
+            items.append(item)
+            batch_size += 1
+
+        if batch:
+            self.attach_items(parent, batch)
+        return counter
 
-        if self.invisibleRootItem().childCount() > 0:
-            box = QMessageBox()
-            box.setIcon(QMessageBox.Question)
-            box.setWindowTitle('Clear or Append ?')
-            box.setText("Do you want to append new animations to the tree"
-                        "or clear the tree and build a new one from the new animations ?")
-            box.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
-            buttonY = box.button(QMessageBox.Yes)
-            buttonY.setText('Clear')
-            buttonN = box.button(QMessageBox.No)
-            buttonN.setText('Append')
-            box.exec_()
-
-            if box.clickedButton() == buttonY:
-                self.clear()
-            elif box.clickedButton() == buttonN:
-                answer = question(None, "Duplicates ?", "Do you want to ignore already existing animations ?")
-                if answer == QMessageBox.Yes:
-                    animations = self.animations_id()
-        root = widget.AnimTreeItem.AnimTreeItem(self)
-        for package in packages:
-            section = widget.AnimTreeItem.AnimTreeItem()
-            section.setText(0, package.name)
-            root.add_nested_child(section)
-
-            for module in package.items:
-                module_section = widget.AnimTreeItem.AnimTreeItem()
-                module_section.setText(0, module.name)
-                section.add_nested_child(module_section)
-
-                previous_animation = ""
-                anim_section = None
-                counter = 1
-                for animation in module.items:
-                    if animation.parse_name() != previous_animation or not anim_section:
-                        previous_animation = animation.parse_name()
-                        counter = 1
-                        anim_section = widget.AnimTreeItem.AnimTreeItem()
-                        anim_section.setText(0, animation.parse_name()[slice(0, get_config().getint("PLUGIN", "maxItemStringLength"))])
-                        module_section.add_nested_child(anim_section)
-
-                    for i, stage in enumerate(animation.stages):
-                        if animation.stages[i] in animations:
-                            duplicate_counter += 1
-                            log.warning("Duplicate found : " + animation.stages[i] + " in " + package.name + " | " + module.name)
-                        else:
-                            stage_section = widget.AnimTreeItem.AnimTreeItem()
-                            stage_section.set_animation(animation, i)
-                            anim_section.add_nested_child(stage_section)
-                            counter += 1
-                            animations.append(animation.stages[i])
+    def attach_items(self, parent, items):
+        """ Add built items at once, without repainting in between """
+        self.suspend_updates()
+        parent.addChildren(items)
+        self.resume_updates()
 
+    def create_from_packages(self, packages):
+        self.begin_packages()
+        self.add_packages(packages)
+        return self.end_packages()
+
+    def begin_packages(self):
+        """ Start adding packages, they are gathered under a temporary root until end_packages is called """
+        self.pendingAnimations = self.ask_clear_or_append()
+        self.pendingDuplicates = 0
+        # Added once built : an item given the tree to its constructor is inserted before its Python class is set,
+        # slots receiving rowsInserted would see another wrapper of it
+        self.pendingRoot = widget.AnimTreeItem.AnimTreeItem()
+        self.pendingRoot.setText(0, "Scanning...")
+        self.addTopLevelItem(self.pendingRoot)
+        self.pendingRoot.setExpanded(True)
+
+    def add_packages(self, packages):
+        """ Add packages under the temporary root, see begin_packages """
+        self.add_catalog(Catalog.from_packages(packages))
+
+    def add_catalog(self, catalog):
+        """ Add the packages of a catalog under the temporary root, see begin_packages """
+        # Either the index of the tree itself, or the animations added since begin_packages
+        animations = self.pendingAnimations
+        track_added = animations is not self.animationIds
+
+        self.suspend_updates()
+        with Timing.span("build") as timing:
+            for package in range(catalog.package_count()):
+                # The layout is computed first, then its items are created detached and attached once per package
+                section, duplicates = build_package(catalog, package, animations, self.register_animation, track_added)
+                self.pendingDuplicates += duplicates
+                self.pendingRoot.add_nested_child(widget.AnimTreeItem.AnimTreeItem.from_menu_node(section, self.searchIndex))
+                timing.add("duplicates", duplicates)
+            timing.add("packages", catalog.package_count())
+        self.resume_updates()
+
+    def end_packages(self):
+        """
+        Move added packages from the temporary root to the tree
+        :return: number of duplicates found (and not added)
+        """
+        root = self.pendingRoot
         invisible_root = self.invisibleRootItem()
-        for i in range(root.childCount()):
-            child = root.takeChild(0)
-            invisible_root.addChild(child)
-        invisible_root.removeChild(root)
-
-        return duplicate_counter
+        self.suspend_updates()
+        with Timing.span("build"):
+            # Items are moved, they stay indexed
+            self.bMovingItems = True
+            invisible_root.addChildren(root.takeChildren())
+            self.bMovingItems = False
+            invisible_root.removeChild(root)
+        self.resume_updates()
+
+        self.pendingRoot = None
+        self.pendingAnimations = set()
+        return self.pendingDuplicates
+
+    def suspend_updates(self):
+        """ Stop repainting and sorting during a bulk change, until resume_updates """
+        self.bWasSortingEnabled = self.isSortingEnabled()
+        self.setSortingEnabled(False)
+        self.setUpdatesEnabled(False)
+
+    def resume_updates(self):
+        self.setUpdatesEnabled(True)
+        self.setSortingEnabled(self.bWasSortingEnabled)
 
     def open_menu(self):
         selection = self.selectedItems()
         if selection:
-            menu = QMenu()
-            menu.addAction("Check All", self.check_all)
-            menu.addAction("Uncheck All", self.action_uncheck_all)
-            menu.addAction("Cleanup", self.cleanup)
-            menu.addSeparator()
-            menu.addAction("Insert parent", self.action_insert_parent)
-            menu.addAction("Merge", self.action_merge)
-            menu.addAction("Remove", self.action_remove_from_parent)
-            menu.exec_(QCursor.pos())
+            create_tree_menu(self).exec_(QCursor.pos())
         return
 
     def to_xml(self, plugin_name):
         root = self.invisibleRootItem()
         folder0 = ET.Element("folder0")
         folder0.set("n", plugin_name)
-        folder0.set("i", get_config().get("PLUGIN", "defaultPackageIcon"))
+        folder0.set("i", get_settings().defaultPackageIcon)
 
         for i in range(root.childCount()):
             child = root.child(i)
@@ -370,4 +884,44 @@ class AnimTreeWidget(QTreeWidget):
                     widget.AnimTreeItem.AnimTreeItem.convert_to_anim_tree_item(child)
 
                 child.to_xml(folder0, 1)
-        return folder0
\ No newline at end of file
+        return folder0
+
+    def write_xml(self, writer, plugin_name):
+        """ Stream the checked tree to a util.MyoWriter.MyoWriter, same output as to_xml """
+        set_icon = get_settings().defaultSetIcon
+        folder_icon = get_settings().defaultFolderIcon
+        animation_icon = get_settings().defaultAnimationIcon
+
+        def checked_children(item, level):
+            children = []
+            for i in range(item.childCount()):
+                child = item.child(i)
+                if child.checkState(0) != Qt.Unchecked:
+                    try:
+                        test = child.bIsSplitter
+                    except AttributeError:
+                        log.warning("TreeItem detected ! Should be AnimTreeItem, trying to convert it")
+                        widget.AnimTreeItem.AnimTreeItem.convert_to_anim_tree_item(child)
+                    children.append((child, level))
+            children.reverse()
+            return children
+
+        writer.open_folder(0, plugin_name, get_settings().defaultPackageIcon)
+        # None closes the folder opened before its children
+        stack = checked_children(self.invisibleRootItem(), 1)
+        while stack:
+            item, level = stack.pop()
+            if item is None:
+                writer.close_folder()
+                continue
+
+            name = item.text(AnimTreeWidget.COLUMN.NAME.value)
+            icon = item.text(AnimTreeWidget.COLUMN.ICON.value)
+            anim_id = item.text(AnimTreeWidget.COLUMN.ID.value)
+            if item.bIsSplitter or not anim_id:
+                writer.open_folder(level, name, icon or (set_icon if item.bIsSplitter else folder_icon))
+                stack.append((None, level))
+                stack.extend(checked_children(item, level + 1))
+            else:
+                writer.entry(name, icon or animation_icon, anim_id)
+        writer.close_folder()
\ No newline at end of file
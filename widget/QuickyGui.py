@@ -1,6 +1,7 @@
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
-from PyQt5.QtWidgets import (QPushButton, QLCDNumber, QLabel, QGroupBox, QMessageBox)
+from PyQt5.QtWidgets import (QPushButton, QLCDNumber, QLabel, QGroupBox, QMessageBox, QProgressBar, QLineEdit,
+                             QMenu)
 
 
 def create_button(parent, text, fun):
@@ -32,10 +33,62 @@ def create_label(self, text):
     return label
 
 
+def create_line_edit(parent, placeholder, fun):
+    line_edit = QLineEdit(parent)
+    line_edit.setFont(get_normal_font())
+    line_edit.setPlaceholderText(placeholder)
+    line_edit.setClearButtonEnabled(True)
+    line_edit.textChanged.connect(fun)
+    return line_edit
+
+
+def create_progress_bar(parent):
+    progress_bar = QProgressBar(parent)
+    progress_bar.setFont(get_normal_font())
+    progress_bar.setAlignment(Qt.AlignCenter)
+    return progress_bar
+
+
+def create_tree_menu(tree):
+    """ :return: context menu of AnimTreeWidget and AnimTreeView, on their selection """
+    menu = QMenu()
+    menu.addAction("Check Selection", tree.action_check_selection)
+    menu.addAction("Uncheck Selection", tree.action_uncheck_selection)
+    menu.addAction("Check All", tree.check_all)
+    menu.addAction("Uncheck All", tree.action_uncheck_all)
+    menu.addAction("Cleanup", tree.cleanup)
+    menu.addSeparator()
+    menu.addAction("Insert parent", tree.action_insert_parent)
+    menu.addAction("Merge", tree.action_merge)
+    menu.addAction("Remove", tree.action_remove_from_parent)
+    return menu
+
+
 def question(widget, title, text):
     return QMessageBox.question(widget, title, text, QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
 
 
+def clear_or_append(widget):
+    """ :return: QMessageBox.Yes to clear, QMessageBox.No to append, QMessageBox.NoButton if closed """
+    box = QMessageBox(widget)
+    box.setIcon(QMessageBox.Question)
+    box.setWindowTitle('Clear or Append ?')
+    box.setText("Do you want to append new animations to the tree"
+                "or clear the tree and build a new one from the new animations ?")
+    box.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
+    buttonY = box.button(QMessageBox.Yes)
+    buttonY.setText('Clear')
+    buttonN = box.button(QMessageBox.No)
+    buttonN.setText('Append')
+    box.exec_()
+
+    if box.clickedButton() == buttonY:
+        return QMessageBox.Yes
+    elif box.clickedButton() == buttonN:
+        return QMessageBox.No
+    return QMessageBox.NoButton
+
+
 def get_title_font():
     return QFont("Bahnschrift", 13, QFont.Bold)
 
@@ -0,0 +1,83 @@
+import time
+import logging
+
+from data import Scanner
+from data.Catalog import Catalog
+from PyQt5.QtCore import QThread, pyqtSignal
+
+log = logging.getLogger(__name__)
+
+
+class ScanWorker(QThread):
+    """
+    Discover, parse and group FNIS lists out of the GUI thread.
+    Packages are sent back in batches, in their final order, as soon as they are complete.
+    Each batch is sent as a Catalog, built here rather than in the GUI thread.
+    """
+
+    # Emitted at most every BATCH_INTERVAL seconds
+    BATCH_INTERVAL = 0.1
+
+    catalogReady = pyqtSignal(object)
+    progress = pyqtSignal(int, int, int)  # lists read, lists found, animations read
+
+    def __init__(self, scan_dir, parent=None):
+        super().__init__(parent)
+        self.scan_dir = scan_dir
+        self.cancelled = False
+        self.listCount = 0
+        self.animationCount = 0
+        self.error = None
+
+    def cancel(self):
+        self.cancelled = True
+        self.requestInterruption()
+
+    def run(self):
+        try:
+            self.scan()
+        except Exception as e:
+            log.exception("Scan failed")
+            self.error = e
+
+    def scan(self):
+        discovery, results = Scanner.scan_lists(self.scan_dir)
+        total = len(discovery.entries)
+        self.progress.emit(0, total, 0)
+
+        last_progress = time.perf_counter()
+
+        def counted(lists):
+            nonlocal last_progress
+            for animations in lists:
+                if self.isInterruptionRequested():
+                    return
+                self.listCount += 1
+                self.animationCount += sum(len(animation.stages) for animation in animations)
+
+                now = time.perf_counter()
+                if now - last_progress >= self.BATCH_INTERVAL:
+                    self.progress.emit(self.listCount, total, self.animationCount)
+                    last_progress = now
+                yield animations
+
+        batch = []
+        last_emit = 0  # First package is sent right away
+        try:
+            for package in Scanner.iter_packages(discovery.entries, counted(results)):
+                if self.isInterruptionRequested():
+                    log.info("Scan cancelled")
+                    break
+                batch.append(package)
+
+                now = time.perf_counter()
+                if now - last_emit >= self.BATCH_INTERVAL:
+                    self.catalogReady.emit(Catalog.from_packages(batch))
+                    batch = []
+                    last_emit = now
+        finally:
+            results.close()
+
+        if batch:
+            self.catalogReady.emit(Catalog.from_packages(batch))
+        self.progress.emit(self.listCount, total, self.animationCount)